@@ -5,6 +5,26 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from utils.dataset_stats import get_dataset_statistics
+from utils.intent_router import IntentRouter
+
+
+# Intent -> (trigger keywords, handler); declaration order breaks score ties
+AGENT_INTENTS = {
+    'feature_importance': (['feature', 'affect', 'influence', 'important'], '_analyze_feature_importance'),
+    'future_trends': (['predict', 'forecast', 'growth', 'future'], '_analyze_future_trends'),
+    'value_opportunities': (['undervalued', 'overvalued', 'value', 'deal'], '_find_value_opportunities'),
+    'averages': (['average', 'mean', 'typical', 'median'], '_analyze_averages'),
+    'premium_properties': (['best', 'top', 'highest', 'premium'], '_analyze_premium_properties'),
+    'correlations': (['correlation', 'relationship', 'related'], '_analyze_correlations'),
+    'market_summary': (['summary', 'overview', 'insights'], '_generate_market_summary'),
+    'general': ([], '_generate_general_analysis')
+}
+
+AGENT_ROUTER = IntentRouter(
+    [(intent, keywords) for intent, (keywords, _) in AGENT_INTENTS.items()],
+    default_intent='general'
+)
 
 
 class OracleSamuelAgent:
@@ -18,41 +38,42 @@ class OracleSamuelAgent:
         self.predictor = predictor
         self.name = "Oracle Samuel"
         self.title = "Real Estate Market Prophet"
+        self._stats = None
+        self._stats_source = None
     
-    def analyze_query(self, query):
-        """Main analysis method - interprets user questions"""
-        query_lower = query.lower()
-        
-        # Route to appropriate analysis method
-        if any(word in query_lower for word in ['feature', 'affect', 'influence', 'important']):
-            return self._analyze_feature_importance()
-        
-        elif any(word in query_lower for word in ['predict', 'forecast', 'growth', 'future']):
-            return self._analyze_future_trends()
-        
-        elif any(word in query_lower for word in ['undervalued', 'overvalued', 'value', 'deal']):
-            return self._find_value_opportunities()
-        
-        elif any(word in query_lower for word in ['average', 'mean', 'typical', 'median']):
-            return self._analyze_averages()
-        
-        elif any(word in query_lower for word in ['best', 'top', 'highest', 'premium']):
-            return self._analyze_premium_properties()
-        
-        elif any(word in query_lower for word in ['correlation', 'relationship', 'related']):
-            return self._analyze_correlations()
-        
-        elif any(word in query_lower for word in ['summary', 'overview', 'insights']):
-            return self._generate_market_summary()
+    @property
+    def stats(self):
+        """Statistics snapshot of self.df, shared across agents with the same dataset fingerprint"""
+        if self._stats is None or self._stats_source is not self.df:
+            self._stats = get_dataset_statistics(self.df)
+            self._stats_source = self.df
+        return self._stats
+    
+    def append_data(self, new_rows, df=None):
+        """Append rows to the dataset and refresh the statistics incrementally"""
+        self._stats = self.stats.append(new_rows, df)
+        self.df = self._stats.df
+        self._stats_source = self.df
+    
+    def route_query(self, query):
+        """Scored intents for a query, best first"""
+        return AGENT_ROUTER.route(query)
+    
+    def analyze_query(self, query, max_intents=1, routes=None):
+        """Main analysis method - interprets user questions (routes: precomputed route_query result)"""
+        if routes is None:
+            routes = self.route_query(query)
+        routes = routes[:max_intents]
         
-        else:
-            return self._generate_general_analysis()
+        # Route to appropriate analysis method(s)
+        responses = [getattr(self, AGENT_INTENTS[intent][1])() for intent, _ in routes]
+        return "\n\n".join(responses)
     
     def _analyze_feature_importance(self):
         """Analyze which features most affect price"""
         response = f"## 🔍 Feature Importance Analysis\n\n"
         
-        if self.predictor and self.predictor.feature_importance is not None:
+        if self.predictor and getattr(self.predictor, 'feature_importance', None) is not None:
             top_features = self.predictor.get_top_features(5)
             
             response += "Based on advanced machine learning analysis, here are the **Top 5 Factors** influencing property prices:\n\n"
@@ -78,9 +99,9 @@ class OracleSamuelAgent:
         # Find price column
         price_col = self._find_price_column()
         if price_col:
-            current_avg = self.df[price_col].mean()
-            current_median = self.df[price_col].median()
-            price_std = self.df[price_col].std()
+            current_avg = self.stats.mean(price_col)
+            current_median = self.stats.median(price_col)
+            price_std = self.stats.std(price_col)
             
             # Simple growth projection
             projected_growth = 0.05  # 5% annual growth assumption
@@ -109,34 +130,25 @@ class OracleSamuelAgent:
         """Find undervalued properties"""
         response = f"## 💎 Value Opportunity Analysis\n\n"
         
-        price_col = self._find_price_column()
-        if price_col and self.predictor and self.predictor.model:
-            # Calculate predicted vs actual
-            X, y = self.predictor.prepare_data()
-            predictions = self.predictor.model.predict(X)
-            
-            # Find undervalued (actual < predicted)
-            self.df['predicted_price'] = predictions
-            self.df['value_gap'] = ((predictions - y) / y * 100)
+        if self.predictor and getattr(self.predictor, 'model', None) is not None:
+            # Predictions and the value-gap ranking are cached per model and dataset
+            opportunities, error = self.stats.value_opportunities(self.predictor, min_gap=10, top_k=5)
             
-            undervalued = self.df[self.df['value_gap'] > 10].sort_values('value_gap', ascending=False)
-            
-            if len(undervalued) > 0:
-                response += f"🎯 **Found {len(undervalued)} Undervalued Properties!**\n\n"
+            if error:
+                response += f"⚠️ {error}\n"
+            elif opportunities['count'] > 0:
+                response += f"🎯 **Found {opportunities['count']} Undervalued Properties!**\n\n"
                 response += "These properties are priced below their predicted market value:\n\n"
                 
-                for idx, row in undervalued.head(5).iterrows():
-                    actual = row[price_col]
-                    predicted = row['predicted_price']
+                for idx, row in opportunities['top'].iterrows():
+                    actual = row['actual']
+                    predicted = row['predicted']
                     gap = row['value_gap']
                     response += f"**Property #{idx}**: Listed at ${actual:,.0f}, Worth ~${predicted:,.0f} (💰 {gap:.1f}% upside)\n"
                 
                 response += f"\n💡 **Investment Insight**: These properties represent the strongest value plays in your dataset.\n"
             else:
                 response += "All properties appear fairly valued relative to market predictions.\n"
-            
-            # Clean up temporary columns
-            self.df.drop(['predicted_price', 'value_gap'], axis=1, inplace=True, errors='ignore')
         else:
             response += "⚠️ Please train the ML model first for value analysis.\n"
         
@@ -146,11 +158,11 @@ class OracleSamuelAgent:
         """Analyze average statistics"""
         response = f"## 📊 Market Averages & Statistics\n\n"
         
-        numeric_cols = self.df.select_dtypes(include=[np.number]).columns
+        numeric_cols = self.stats.numeric_columns
         
         for col in numeric_cols[:5]:  # Top 5 numeric columns
-            avg_val = self.df[col].mean()
-            median_val = self.df[col].median()
+            avg_val = self.stats.mean(col)
+            median_val = self.stats.median(col)
             col_name = col.replace('_', ' ').title()
             
             response += f"**{col_name}:**\n"
@@ -166,21 +178,17 @@ class OracleSamuelAgent:
         price_col = self._find_price_column()
         if price_col:
             # Get top 10% by price
-            threshold = self.df[price_col].quantile(0.90)
-            premium_props = self.df[self.df[price_col] >= threshold]
+            premium = self.stats.premium_segment(0.90)
             
             response += f"**Premium Market Segment** (Top 10%):\n"
-            response += f"- Properties: {len(premium_props)}\n"
-            response += f"- Price Threshold: ${threshold:,.0f}\n"
-            response += f"- Average Premium Price: ${premium_props[price_col].mean():,.0f}\n\n"
+            response += f"- Properties: {premium['count']}\n"
+            response += f"- Price Threshold: ${premium['threshold']:,.0f}\n"
+            response += f"- Average Premium Price: ${premium['average_price']:,.0f}\n\n"
             
             # Analyze common features
-            numeric_cols = premium_props.select_dtypes(include=[np.number]).columns
             response += "**Premium Property Characteristics:**\n"
-            for col in numeric_cols[:3]:
-                if col != price_col:
-                    avg = premium_props[col].mean()
-                    response += f"- Avg {col.replace('_', ' ').title()}: {avg:.1f}\n"
+            for col, avg in premium['feature_means'].items():
+                response += f"- Avg {col.replace('_', ' ').title()}: {avg:.1f}\n"
         
         return response
     
@@ -188,15 +196,15 @@ class OracleSamuelAgent:
         """Analyze feature correlations"""
         response = f"## 🔗 Feature Correlation Analysis\n\n"
         
-        if self.predictor:
-            correlations = self.predictor.analyze_correlation()
-            if correlations is not None:
-                response += "**Strongest Correlations with Price:**\n\n"
-                for feature, corr in correlations.head(6).items():
-                    if abs(corr) < 1.0:  # Exclude self-correlation
-                        strength = "Strong" if abs(corr) > 0.7 else "Moderate" if abs(corr) > 0.4 else "Weak"
-                        direction = "positive" if corr > 0 else "negative"
-                        response += f"- **{feature.replace('_', ' ').title()}**: {corr:.3f} ({strength} {direction})\n"
+        target = getattr(self.predictor, 'target_column', None) if self.predictor else None
+        if target in self.stats.numeric_columns:
+            correlations = self.stats.correlations_with(target).sort_values(ascending=False)
+            response += "**Strongest Correlations with Price:**\n\n"
+            for feature, corr in correlations.head(6).items():
+                if abs(corr) < 1.0:  # Exclude self-correlation
+                    strength = "Strong" if abs(corr) > 0.7 else "Moderate" if abs(corr) > 0.4 else "Weak"
+                    direction = "positive" if corr > 0 else "negative"
+                    response += f"- **{feature.replace('_', ' ').title()}**: {corr:.3f} ({strength} {direction})\n"
         
         return response
     
@@ -205,23 +213,23 @@ class OracleSamuelAgent:
         response = f"## 📋 Market Summary Report\n\n"
         
         response += f"**Dataset Overview:**\n"
-        response += f"- Total Properties: {len(self.df)}\n"
-        response += f"- Features Analyzed: {len(self.df.columns)}\n\n"
+        response += f"- Total Properties: {self.stats.row_count}\n"
+        response += f"- Features Analyzed: {len(self.stats.columns)}\n\n"
         
         price_col = self._find_price_column()
         if price_col:
             response += f"**Price Analysis:**\n"
-            response += f"- Average: ${self.df[price_col].mean():,.0f}\n"
-            response += f"- Median: ${self.df[price_col].median():,.0f}\n"
-            response += f"- Range: ${self.df[price_col].min():,.0f} - ${self.df[price_col].max():,.0f}\n\n"
+            response += f"- Average: ${self.stats.mean(price_col):,.0f}\n"
+            response += f"- Median: ${self.stats.median(price_col):,.0f}\n"
+            response += f"- Range: ${self.stats.min(price_col):,.0f} - ${self.stats.max(price_col):,.0f}\n\n"
         
-        if self.predictor and self.predictor.metrics:
+        if self.predictor and getattr(self.predictor, 'metrics', None):
             response += f"**Model Performance:**\n"
             response += f"- Accuracy (R²): {self.predictor.metrics['r2_score']:.2%}\n"
             response += f"- Prediction Error (MAE): ${self.predictor.metrics['mae']:,.0f}\n\n"
         
         response += f"💡 **Oracle Samuel's Insight**: This market shows "
-        if price_col and self.df[price_col].std() / self.df[price_col].mean() < 0.3:
+        if price_col and self.stats.std(price_col) / self.stats.mean(price_col) < 0.3:
             response += "consistent pricing patterns, ideal for predictable investments."
         else:
             response += "diverse pricing opportunities, suitable for value-hunting strategies."
@@ -234,11 +242,7 @@ class OracleSamuelAgent:
     
     def _find_price_column(self):
         """Helper: Find the price column"""
-        price_keywords = ['price', 'cost', 'value', 'amount']
-        for col in self.df.columns:
-            if any(keyword in col.lower() for keyword in price_keywords):
-                return col
-        return None
+        return self.stats.price_column
     
     def get_greeting(self):
         """Return agent greeting"""
@@ -16,7 +16,7 @@ from sklearn.metrics import confusion_matrix, classification_report, accuracy_sc
 from sklearn.preprocessing import StandardScaler
 
 # Import custom modules
-from utils.md5_manager import generate_md5_from_dataframe, create_signature_record
+from utils.md5_manager import create_signature_record, fingerprint_dataframe
 from utils.database_manager import DatabaseManager
 
 # Import flowing blue lines background
@@ -29,7 +29,7 @@ from agent import OracleSamuelAgent
 # Import self-learning modules
 from self_learning.trainer import SelfLearningTrainer
 from self_learning.evaluator import ModelEvaluator
-from self_learning.retrain_manager import RetrainManager
+from self_learning.retrain_manager import RetrainManager, DATASET_UNCHANGED
 from self_learning.feedback_manager import FeedbackManager
 from self_learning.knowledge_base import KnowledgeBase
 
@@ -536,16 +536,18 @@ else:
 
                 st.session_state.cleaned_df = cleaned_df
 
-                # Generate MD5
-                md5_hash = generate_md5_from_dataframe(cleaned_df)
+                # Generate MD5 and block tree in one pass (both let appended rows skip a full rehash)
+                st.session_state.md5_hasher, st.session_state.merkle_tree = fingerprint_dataframe(cleaned_df)
+                md5_hash = st.session_state.merkle_tree['fingerprint']
                 st.session_state.md5_hash = md5_hash
 
                 # Save to database
-                success, msg = db.save_uploaded_data(cleaned_df)
+                success, msg = db.save_uploaded_data(cleaned_df, md5_hash=md5_hash)
 
                 # Save signature
                 signature = create_signature_record(uploaded_file.name, md5_hash)
                 db.save_signature(signature)
+                db.save_merkle_tree(md5_hash, st.session_state.merkle_tree)
 
                 # Initialize predictor and agent
                 st.session_state.predictor = RealEstatePredictor(cleaned_df)
@@ -733,16 +735,18 @@ with tab1:
                         
                         st.session_state.cleaned_df = cleaned_df
                         
-                        # Generate MD5
-                        md5_hash = generate_md5_from_dataframe(cleaned_df)
+                        # Generate MD5 and block tree in one pass (both let appended rows skip a full rehash)
+                        st.session_state.md5_hasher, st.session_state.merkle_tree = fingerprint_dataframe(cleaned_df)
+                        md5_hash = st.session_state.merkle_tree['fingerprint']
                         st.session_state.md5_hash = md5_hash
                         
                         # Save to database
-                        success, msg = db.save_uploaded_data(cleaned_df)
+                        success, msg = db.save_uploaded_data(cleaned_df, md5_hash=md5_hash)
                         
                         # Save signature
                         signature = create_signature_record(uploaded_file.name, md5_hash)
                         db.save_signature(signature)
+                        db.save_merkle_tree(md5_hash, st.session_state.merkle_tree)
                         
                         # Initialize predictor and agent
                         st.session_state.predictor = RealEstatePredictor(cleaned_df)
@@ -778,6 +782,8 @@ with tab1:
             if st.button("Reset Data"):
                 st.session_state.df = None
                 st.session_state.cleaned_df = None
+                st.session_state.md5_hasher = None
+                st.session_state.merkle_tree = None
                 st.session_state.predictor = None
                 st.session_state.agent = None
                 st.session_state.model_trained = False
@@ -814,15 +820,20 @@ with tab2:
         if st.button("Retrain Now", type="primary", use_container_width=True, key="retrain_button_1"):
             if st.session_state.cleaned_df is not None:
                 with st.spinner("🧠 Training multiple models... This may take a moment..."):
-                    # Retrain using self-learning system
-                    success, result = st.session_state.retrain_manager.retrain_all()
+                    # Retrain using self-learning system: appended rows update the current model,
+                    # otherwise the candidate models are refitted in parallel
+                    success, result = st.session_state.retrain_manager.retrain_all(incremental=True, parallel=True)
                     
-                    if success:
+                    if success and result.get('buffered'):
+                        st.info(f"ℹ️ {result['new_samples']} new rows kept until more data arrives")
+                    elif success:
                         st.success(f"✅ Retraining complete! Best model: **{result['best_model']}**")
                         st.metric("R² Score", f"{result['r2']:.4f}")
                         st.metric("MAE", f"${result['mae']:,.0f}")
                         st.balloons()
                         st.rerun()
+                    elif result == DATASET_UNCHANGED:
+                        st.info("ℹ️ Dataset unchanged since the last retrain - model is up to date")
                     else:
                         st.error(f"❌ Retraining failed: {result}")
             else:
@@ -1030,19 +1041,19 @@ with tab2:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        eval_count = len(st.session_state.evaluator.get_evaluation_history(1000))
+        eval_count = st.session_state.evaluator.count_evaluations()
         st.metric("Total Trainings", eval_count)
     
     with col2:
-        feedback_count = st.session_state.feedback_manager.get_feedback_summary()['total_feedback']
+        feedback_count = st.session_state.feedback_manager.count_feedback()
         st.metric("Total Feedback", feedback_count)
     
     with col3:
-        insights_count = len(st.session_state.knowledge_base.get_all_insights(1000))
+        insights_count = st.session_state.knowledge_base.count_insights()
         st.metric("Insights Generated", insights_count)
     
     with col4:
-        retrain_count = len(st.session_state.retrain_manager.get_retrain_history(1000))
+        retrain_count = st.session_state.retrain_manager.count_retrains()
         st.metric("Retrains Performed", retrain_count)
 
 # ===========================
@@ -1167,7 +1178,7 @@ with tab4:
         col1.metric("Total Properties", len(df))
         col2.metric("Total Features", len(df.columns))
         col3.metric("Numeric Features", len(df.select_dtypes(include=[np.number]).columns))
-        col4.metric("Categorical Features", len(df.select_dtypes(include=['object']).columns))
+        col4.metric("Categorical Features", len(df.select_dtypes(include=['object', 'category']).columns))
         
         st.markdown("---")
         
@@ -1559,15 +1570,20 @@ with tab6:
         if st.button("Retrain Now", type="primary", use_container_width=True, key="retrain_voice_vision"):
             if st.session_state.cleaned_df is not None:
                 with st.spinner("🧠 Training multiple models... This may take a moment..."):
-                    # Retrain using self-learning system
-                    success, result = st.session_state.retrain_manager.retrain_all()
+                    # Retrain using self-learning system: appended rows update the current model,
+                    # otherwise the candidate models are refitted in parallel
+                    success, result = st.session_state.retrain_manager.retrain_all(incremental=True, parallel=True)
                     
-                    if success:
+                    if success and result.get('buffered'):
+                        st.info(f"ℹ️ {result['new_samples']} new rows kept until more data arrives")
+                    elif success:
                         st.success(f"✅ Retraining complete! Best model: **{result['best_model']}**")
                         st.metric("R² Score", f"{result['r2']:.4f}")
                         st.metric("MAE", f"${result['mae']:,.0f}")
                         st.balloons()
                         st.rerun()
+                    elif result == DATASET_UNCHANGED:
+                        st.info("ℹ️ Dataset unchanged since the last retrain - model is up to date")
                     else:
                         st.error(f"❌ Retraining failed: {result}")
             else:
@@ -1775,19 +1791,19 @@ with tab6:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        eval_count = len(st.session_state.evaluator.get_evaluation_history(1000))
+        eval_count = st.session_state.evaluator.count_evaluations()
         st.metric("Total Trainings", eval_count)
     
     with col2:
-        feedback_count = st.session_state.feedback_manager.get_feedback_summary()['total_feedback']
+        feedback_count = st.session_state.feedback_manager.count_feedback()
         st.metric("Total Feedback", feedback_count)
     
     with col3:
-        insights_count = len(st.session_state.knowledge_base.get_all_insights(1000))
+        insights_count = st.session_state.knowledge_base.count_insights()
         st.metric("Insights Generated", insights_count)
     
     with col4:
-        retrain_count = len(st.session_state.retrain_manager.get_retrain_history(1000))
+        retrain_count = st.session_state.retrain_manager.count_retrains()
         st.metric("Retrains Performed", retrain_count)
 
 # ===========================
@@ -2092,7 +2108,7 @@ with tab7:
         
         # Get column information for form
         numeric_cols = current_df.select_dtypes(include=[np.number]).columns.tolist()
-        categorical_cols = current_df.select_dtypes(include=['object']).columns.tolist()
+        categorical_cols = current_df.select_dtypes(include=['object', 'category']).columns.tolist()
         
         # Check for client ID column
         client_id_cols = [col for col in current_df.columns if 'id' in col.lower() or 'client' in col.lower()]
@@ -2345,6 +2361,10 @@ with tab7:
                             # Update session state FIRST
                             st.session_state.cleaned_df = updated_df
                             
+                            # Keep the agent on the new data; its statistics merge the row incrementally
+                            if st.session_state.get('agent') is not None:
+                                st.session_state.agent.append_data(new_row_df, updated_df)
+                            
                             # Clear cached enhanced features since data has changed
                             if 'enhanced_features' in st.session_state:
                                 st.session_state.enhanced_features = {
@@ -2356,16 +2376,25 @@ with tab7:
                                     'price_categories': None
                                 }
                             
-                            # Regenerate MD5 hash
-                            new_md5_hash = generate_md5_from_dataframe(updated_df)
+                            # Regenerate MD5 hash - only the appended row is hashed when the previous state is known
+                            st.session_state.md5_hasher, st.session_state.merkle_tree = fingerprint_dataframe(
+                                updated_df,
+                                st.session_state.get('md5_hasher'),
+                                st.session_state.get('merkle_tree')
+                            )
+                            new_md5_hash = st.session_state.merkle_tree['fingerprint']
                             st.session_state.md5_hash = new_md5_hash
                             
-                            # Save updated data to database
-                            success, msg = db.save_uploaded_data(updated_df)
+                            # Persist only the new row; upsert on the client ID when it is a real unique key
+                            if has_client_id and current_df[client_id_cols[0]].is_unique:
+                                success, msg = db.upsert_rows(new_row_df, key_column=client_id_cols[0])
+                            else:
+                                success, msg = db.append_rows(new_row_df)
                             
                             # Save new signature
                             signature = create_signature_record(f"updated_with_client_{st.session_state.validated_client_data.get('first_name', 'unknown')}", new_md5_hash)
                             db.save_signature(signature)
+                            db.save_merkle_tree(new_md5_hash, st.session_state.merkle_tree)
                             
                             # Force immediate refresh
                             st.success("✅ Client added successfully!")
@@ -6,16 +6,17 @@ from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Backgroun
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 import uvicorn
 from typing import Optional, List
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import hashlib
 import json
 import os
 import sys
+import threading
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -30,8 +31,14 @@ from sqlalchemy.orm import Session
 # Import Oracle Samuel modules
 from utils.md5_manager import generate_md5_from_dataframe
 from utils.database_manager import DatabaseManager
+from utils.data_cleaner import DataCleaner, standardize_column_names
+from utils.data_ingestion import ingest_csv
 from utils.predictor import RealEstatePredictor
-from self_learning.trainer import SelfLearningTrainer
+from utils.model_registry import get_model_registry
+from utils.session_store import ChatSessionStore
+from utils.similarity_index import SimilarityIndex
+from utils.prediction_cache import PredictionCache
+from self_learning.trainer import SelfLearningTrainer, INTERVAL_CONFIDENCE
 from self_learning.evaluator import ModelEvaluator
 from agent import OracleSamuelAgent
 
@@ -77,6 +84,19 @@ redis_client = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
 # Database
 db_manager = DatabaseManager()
 
+# Trained model, loaded once per worker and hot-swapped on new MD5
+model_registry = get_model_registry(os.getenv("MODEL_PATH", "oracle_samuel_model.pkl"))
+
+# Prediction responses cached per (request, model MD5); hit/miss counters on /metrics
+prediction_cache = PredictionCache(redis_client, ttl_seconds=int(os.getenv("PREDICTION_CACHE_TTL", 3600)))
+
+# Chat sessions: per-worker LRU with TTL, answers and history mirrored to Redis
+chat_sessions = ChatSessionStore(
+    redis_client=redis_client,
+    max_sessions=int(os.getenv("CHAT_MAX_SESSIONS", 1000)),
+    ttl_seconds=int(os.getenv("CHAT_SESSION_TTL", 1800))
+)
+
 # Pydantic Models
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -99,7 +119,11 @@ class PredictionRequest(BaseModel):
     furniture: bool = Field(default=False, description="Furnished")
     city: str = Field(..., description="City name")
     district: Optional[str] = Field(None, description="District/neighborhood")
+    similar_count: int = Field(default=5, ge=0, le=50, description="Comparable properties to return")
     
+class BatchPredictionRequest(BaseModel):
+    properties: List[PredictionRequest] = Field(..., min_length=1, description="Properties to score")
+
 class PredictionResponse(BaseModel):
     predicted_price: float
     confidence_interval: dict
@@ -139,6 +163,76 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(se
         raise HTTPException(status_code=401, detail="Invalid API key")
     return token
 
+# Numeric request fields compared when looking up similar properties
+SIMILARITY_FEATURES = ['area', 'rooms', 'bedrooms', 'bathrooms', 'parking_spaces', 'floor', 'animal', 'furniture']
+
+def build_feature_frame(requests: List[PredictionRequest]) -> pd.DataFrame:
+    """Build the model input frame column-wise, named like the cleaned training columns"""
+    return pd.DataFrame({
+        'area': [r.area for r in requests],
+        'rooms': [r.rooms for r in requests],
+        'bedrooms': [r.bedrooms for r in requests],
+        'bathrooms': [r.bathrooms for r in requests],
+        'parking_spaces': [r.parking_spots for r in requests],
+        'floor': [r.floor for r in requests],
+        'animal': [int(r.animal) for r in requests],
+        'furniture': [int(r.furniture) for r in requests],
+        'city': [r.city for r in requests],
+        'district': [r.district or '' for r in requests]
+    })
+
+def interval_confidence(predictor) -> Optional[float]:
+    """Coverage of the predictor's intervals, or None when it has no calibrated intervals"""
+    if not predictor.interval_model:
+        return None
+    return predictor.interval_model.get("confidence", INTERVAL_CONFIDENCE)
+
+def stream_ndjson(predictions: np.ndarray, lower: Optional[np.ndarray], upper: Optional[np.ndarray], chunk_size: int = 1000):
+    """Yield predictions and their intervals (null without one) as newline-delimited JSON, a chunk of rows at a time"""
+    for start in range(0, len(predictions), chunk_size):
+        end = start + chunk_size
+        lows = lower[start:end] if lower is not None else [None] * len(predictions[start:end])
+        highs = upper[start:end] if upper is not None else lows
+        yield "".join(
+            json.dumps({
+                "row": start + i,
+                "predicted_price": float(price),
+                "lower": None if low is None else float(low),
+                "upper": None if high is None else float(high)
+            }) + "\n"
+            for i, (price, low, high) in enumerate(zip(predictions[start:end], lows, highs))
+        )
+
+_chat_agent = None
+_chat_agent_key = None
+_chat_agent_lock = threading.Lock()
+
+def get_chat_agent():
+    """Shared agent over the stored dataset; rebuilt only when the data or model changes"""
+    global _chat_agent, _chat_agent_key
+    
+    predictor, model_md5 = model_registry.get_predictor()
+    # The table's write counter works with or without a Parquet snapshot
+    key = (db_manager.table_version(), model_md5)
+    if _chat_agent is not None and key[0] is not None and _chat_agent_key == key:
+        return _chat_agent, _chat_agent_key
+    
+    with _chat_agent_lock:
+        if _chat_agent is None or key != _chat_agent_key or key[0] is None:
+            df = db_manager.get_saved_data()
+            if df.empty:
+                raise HTTPException(status_code=503, detail="No dataset available")
+            _chat_agent = OracleSamuelAgent(df, predictor)
+            _chat_agent_key = key
+        return _chat_agent, _chat_agent_key
+
+def get_active_predictor():
+    """Return the registry's predictor or fail with 503"""
+    predictor, model_md5 = model_registry.get_predictor()
+    if predictor is None:
+        raise HTTPException(status_code=503, detail="No trained model available")
+    return predictor, model_md5
+
 # Health Check Endpoints
 @app.get("/health", tags=["System"])
 async def health_check():
@@ -160,7 +254,7 @@ async def readiness_check():
 
 # Dataset Upload Endpoint
 @app.post("/api/v1/upload", response_model=JobResponse, tags=["Data"])
-async def upload_dataset(
+def upload_dataset(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     dataset_name: str = "",
@@ -170,25 +264,33 @@ async def upload_dataset(
     """
     Upload a dataset for training Oracle Samuel.
     Returns a job ID for tracking processing status.
+    Plain def: FastAPI runs the blocking ingest in its threadpool, off the event loop.
     """
     import uuid
     job_id = str(uuid.uuid4())
     
     try:
-        # Read uploaded file
-        contents = await file.read()
-        
-        # Determine file type and read
+        # Stream the upload into the store in bounded-size batches;
+        # md5_hash is always the fingerprint of the cleaned, stored rows
         if file.filename.endswith('.csv'):
-            df = pd.read_csv(pd.io.common.BytesIO(contents))
+            success, result = ingest_csv(file.file, db_manager)
+            if not success:
+                raise HTTPException(status_code=400, detail=result)
+            md5_hash = result['md5_hash']
+            row_count = result['rows_saved']
         elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(pd.io.common.BytesIO(contents))
+            # Excel cannot be read incrementally; load once and clean in place
+            df = pd.read_excel(file.file)
+            cleaned_df, _ = DataCleaner(df, copy=False).clean_data()
+            md5_hash = generate_md5_from_dataframe(cleaned_df)
+            success, msg = db_manager.save_uploaded_data(cleaned_df, md5_hash=md5_hash)
+            if not success:
+                raise HTTPException(status_code=500, detail=msg)
+            row_count = len(cleaned_df)
+            del df, cleaned_df
         else:
             raise HTTPException(status_code=400, detail="Unsupported file format. Use CSV or Excel.")
         
-        # Generate MD5
-        md5_hash = generate_md5_from_dataframe(df)
-        
         # Save to object store (S3/GCS)
         # TODO: Implement object store upload
         
@@ -198,7 +300,7 @@ async def upload_dataset(
             "status": JobStatus.PENDING,
             "dataset_name": dataset_name or file.filename,
             "md5_hash": md5_hash,
-            "row_count": len(df),
+            "row_count": row_count,
             "created_at": datetime.utcnow()
         }
         
@@ -206,7 +308,7 @@ async def upload_dataset(
         redis_client.setex(f"job:{job_id}", 3600, json.dumps(job_data, default=str))
         
         # Enqueue background task
-        background_tasks.add_task(process_dataset, job_id, df, md5_hash)
+        background_tasks.add_task(process_dataset, job_id, md5_hash)
         
         logger.info(f"Dataset uploaded successfully. Job ID: {job_id}, MD5: {md5_hash}")
         
@@ -217,14 +319,19 @@ async def upload_dataset(
             updated_at=job_data["created_at"]
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}", extra={"request_id": job_id})
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 # Background task for dataset processing
-async def process_dataset(job_id: str, df: pd.DataFrame, md5_hash: str):
-    """Background task to train model on uploaded dataset"""
+def process_dataset(job_id: str, md5_hash: str):
+    """Background task to train model on uploaded dataset (runs in the threadpool)"""
     try:
+        # Dataset was cleaned and stored chunk by chunk during upload
+        df = db_manager.get_saved_data()
+        
         # Update job status
         redis_client.setex(
             f"job:{job_id}",
@@ -232,13 +339,41 @@ async def process_dataset(job_id: str, df: pd.DataFrame, md5_hash: str):
             json.dumps({"status": JobStatus.PROCESSING, "updated_at": datetime.utcnow()}, default=str)
         )
         
-        # Train model
+        # Train model; the best one replaces the artifact the registry serves
         trainer = SelfLearningTrainer()
-        model, metrics = trainer.train_ensemble(df)
+        training_record, error = trainer.train_multiple_models(df, filename=model_registry.model_path)
+        if error:
+            raise ValueError(error)
+        
+        metrics = {
+            "best_model": training_record["best_model"],
+            "mae": float(training_record["mae"]),
+            "rmse": float(training_record["rmse"]),
+            "r2": float(training_record["r2"])
+        }
         
         # Evaluate model
         evaluator = ModelEvaluator()
-        evaluation = evaluator.evaluate_model(model, df)
+        evaluator.log_evaluation(
+            model_name=metrics["best_model"],
+            mae=metrics["mae"],
+            rmse=metrics["rmse"],
+            r2=metrics["r2"],
+            md5_hash=md5_hash,
+            training_samples=trainer.training_samples,
+            test_samples=len(df) - trainer.training_samples
+        )
+        
+        # Comparables index for this dataset version, swapped in only once its model is saved
+        index = SimilarityIndex.build(
+            df, trainer.target_column,
+            feature_columns=[
+                col for col in SIMILARITY_FEATURES
+                if col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+            ],
+            dataset_md5=md5_hash
+        )
+        index.save(model_registry.index_path)
         
         # Save model to object store
         # TODO: Save to S3/GCS
@@ -249,7 +384,6 @@ async def process_dataset(job_id: str, df: pd.DataFrame, md5_hash: str):
             "status": JobStatus.COMPLETED,
             "md5_hash": md5_hash,
             "metrics": metrics,
-            "evaluation": evaluation,
             "updated_at": datetime.utcnow()
         }
         
@@ -288,7 +422,7 @@ async def get_job_status(job_id: str, api_key: str = Depends(verify_api_key)):
 
 # Prediction Endpoint
 @app.post("/api/v1/predict", response_model=PredictionResponse, tags=["Predictions"])
-async def predict_price(
+def predict_price(
     request: PredictionRequest,
     api_key: str = Depends(verify_api_key)
 ):
@@ -300,39 +434,39 @@ async def predict_price(
     request_id = str(uuid.uuid4())
     
     try:
-        # Load latest model from cache or storage
-        # TODO: Implement model loading from object store
+        # Shared in-memory model; reloaded only when the artifact changes
+        predictor, model_md5 = get_active_predictor()
+        index = model_registry.get_similarity_index()
         
-        # For now, use in-memory predictor
-        predictor = RealEstatePredictor()
+        # Repeat listings are served from Redis until the model or index changes
+        cache_key = prediction_cache.key(
+            request.model_dump(), [model_md5, index.dataset_md5 if index is not None else None]
+        )
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return PredictionResponse(**cached, request_id=request_id)
         
         # Prepare input data
-        input_data = pd.DataFrame([{
-            'area': request.area,
-            'rooms': request.rooms,
-            'bedrooms': request.bedrooms,
-            'bathrooms': request.bathrooms,
-            'parking spaces': request.parking_spots,
-            'floor': request.floor,
-            'animal': int(request.animal),
-            'furniture': int(request.furniture),
-            'city': request.city,
-            'district': request.district or ''
-        }])
+        input_data = build_feature_frame([request])
         
-        # Make prediction (placeholder)
-        # TODO: Load actual model and predict
-        predicted_price = 500000.0  # Placeholder
+        # Point prediction and its interval in one scoring pass
+        result, error = predictor.predict_batch_with_intervals(input_data)
+        if error:
+            raise HTTPException(status_code=422, detail=error)
+        predictions, lower, upper = result
+        predicted_price = float(predictions[0])
         
-        # Calculate confidence interval
+        # Artifacts without a calibrated interval model report no interval
         confidence_interval = {
-            "lower": predicted_price * 0.9,
-            "upper": predicted_price * 1.1,
-            "confidence_level": 0.95
+            "lower": float(lower[0]) if lower is not None else None,
+            "upper": float(upper[0]) if upper is not None else None,
+            "confidence_level": interval_confidence(predictor)
         }
         
-        # Find similar properties
-        similar_properties = []  # TODO: Implement similarity search
+        # Find similar properties (same district, else city, else anywhere)
+        similar_properties = []
+        if index is not None and request.similar_count > 0:
+            similar_properties = index.query(input_data, k=request.similar_count)[0]
         
         # Market insights
         market_insights = {
@@ -343,34 +477,89 @@ async def predict_price(
         
         logger.info(f"Prediction generated: {predicted_price}", extra={"request_id": request_id})
         
-        return PredictionResponse(
-            predicted_price=predicted_price,
-            confidence_interval=confidence_interval,
-            similar_properties=similar_properties,
-            market_insights=market_insights,
-            request_id=request_id
-        )
+        response = {
+            "predicted_price": predicted_price,
+            "confidence_interval": confidence_interval,
+            "similar_properties": similar_properties,
+            "market_insights": market_insights
+        }
+        prediction_cache.set(cache_key, response)
         
+        return PredictionResponse(**response, request_id=request_id)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction failed: {str(e)}", extra={"request_id": request_id})
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+# Batch Prediction Endpoints
+@app.post("/api/v1/predict/batch", tags=["Predictions"])
+def predict_batch(
+    batch: BatchPredictionRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Score many properties in one batched pass, with prediction intervals.
+    Streams results back as NDJSON, one line per input row.
+    A plain def, so the model call runs in the threadpool.
+    """
+    predictor, model_md5 = get_active_predictor()
+    
+    result, error = predictor.predict_batch_with_intervals(build_feature_frame(batch.properties))
+    if error:
+        raise HTTPException(status_code=422, detail=error)
+    
+    logger.info(f"Batch prediction generated for {len(result[0])} rows")
+    return StreamingResponse(stream_ndjson(*result), media_type="application/x-ndjson")
+
+@app.post("/api/v1/predict/batch/csv", tags=["Predictions"])
+def predict_batch_csv(
+    file: UploadFile = File(...),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Score an uploaded CSV of properties in a single model call.
+    Columns follow the training dataset; every trained feature is required.
+    Parsing and scoring block, so this is a plain def run in the threadpool.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Unsupported file format. Use CSV.")
+    
+    predictor, model_md5 = get_active_predictor()
+    
+    try:
+        df = pd.read_csv(file.file)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse CSV: {str(e)}")
+    
+    # Same column naming as the cleaned training data
+    df.columns = standardize_column_names(df.columns)
+    df = df.rename(columns={'parking_spots': 'parking_spaces'})
+    
+    result, error = predictor.predict_batch_with_intervals(df)
+    if error:
+        raise HTTPException(status_code=422, detail=error)
+    
+    logger.info(f"Batch prediction generated for {len(result[0])} CSV rows")
+    return StreamingResponse(stream_ndjson(*result), media_type="application/x-ndjson")
+
 # List Models Endpoint
 @app.get("/api/v1/models", response_model=List[ModelInfo], tags=["Models"])
-async def list_models(api_key: str = Depends(verify_api_key)):
-    """List all available model versions with metrics"""
-    # TODO: Query from database/object store
-    models = [
-        {
-            "model_id": "oracle-v1",
-            "version": "1.0.0",
-            "md5_hash": "abc123def456",
-            "metrics": {"mae": 50000, "r2": 0.85},
-            "created_at": datetime.utcnow(),
-            "is_active": True
-        }
-    ]
-    return [ModelInfo(**m) for m in models]
+def list_models(api_key: str = Depends(verify_api_key)):
+    """List the model served by this worker with its metrics"""
+    info = model_registry.get_model_info()
+    if info is None:
+        return []
+    
+    return [ModelInfo(
+        model_id=info["model_name"],
+        version=info["md5_hash"][:12],
+        md5_hash=info["md5_hash"],
+        metrics=info["metrics"],
+        created_at=info["trained_at"],
+        is_active=True
+    )]
 
 # Feedback Endpoint
 @app.post("/api/v1/feedback", tags=["Feedback"])
@@ -398,31 +587,43 @@ async def submit_feedback(
 
 # Agent Chat Endpoint (for AI assistant)
 @app.post("/api/v1/agent/chat", tags=["Agent"])
-async def agent_chat(
+def agent_chat(
     message: str,
     session_id: str,
     api_key: str = Depends(verify_api_key)
 ):
-    """Chat with Oracle Samuel AI Agent"""
+    """Chat with Oracle Samuel AI Agent (plain def: agent rebuilds read the table in the threadpool)"""
     try:
-        # Initialize agent
-        agent = OracleSamuelAgent()
+        # Shared agent; its router and statistics are reused across messages
+        agent, agent_key = get_chat_agent()
         
-        # Get response
-        response = agent.process_query(message)
-        
-        # Store chat history
-        # TODO: Store in session management
+        # Get response (memoized per session) and record the turn
+        result = chat_sessions.reply(session_id, message, agent, agent_key)
         
         return {
-            "response": response,
+            "response": result["response"],
+            "intents": [{"intent": intent, "score": score} for intent, score in result["routes"]],
+            "cached": result["cached"],
             "session_id": session_id,
             "timestamp": datetime.utcnow().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Agent chat failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/agent/chat/{session_id}/history", tags=["Agent"])
+async def agent_chat_history(session_id: str, api_key: str = Depends(verify_api_key)):
+    """Recent turns of a chat session"""
+    return {"session_id": session_id, "history": chat_sessions.get_history(session_id)}
+
+@app.delete("/api/v1/agent/chat/{session_id}", tags=["Agent"])
+async def end_agent_chat(session_id: str, api_key: str = Depends(verify_api_key)):
+    """Forget a chat session"""
+    chat_sessions.clear(session_id)
+    return {"session_id": session_id, "status": "cleared"}
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -88,7 +88,9 @@ class OracleSamuelBackup:
         db_file = self.source_dir / "oracle_samuel_real_estate.db"
         if db_file.exists():
             dest_db = data_dir / "oracle_samuel_real_estate.db"
-            shutil.copy2(db_file, dest_db)
+            # The database runs in WAL mode; the backup API includes uncheckpointed pages
+            with sqlite3.connect(db_file) as src, sqlite3.connect(dest_db) as dst:
+                src.backup(dst)
             backed_up_files.append("oracle_samuel_real_estate.db")
             print(f"✅ Backed up database: oracle_samuel_real_estate.db")
             
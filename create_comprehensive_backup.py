@@ -122,7 +122,13 @@ def backup_database(backup_dir):
     backed_up_dbs = []
     for db_file in db_files:
         if os.path.exists(db_file):
-            shutil.copy2(db_file, backup_dir)
+            if db_file.endswith('.db'):
+                # The database runs in WAL mode; the backup API includes uncheckpointed pages
+                with sqlite3.connect(db_file) as src, \
+                        sqlite3.connect(os.path.join(backup_dir, db_file)) as dst:
+                    src.backup(dst)
+            else:
+                shutil.copy2(db_file, backup_dir)
             backed_up_dbs.append(db_file)
             print(f"✅ Backed up database: {db_file}")
         else:
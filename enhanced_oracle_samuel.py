@@ -70,7 +70,7 @@ class EnhancedOracleSamuel:
         y = self.df[target_col]
         
         # Handle categorical variables
-        categorical_cols = X.select_dtypes(include=['object']).columns
+        categorical_cols = X.select_dtypes(include=['object', 'category']).columns
         for col in categorical_cols:
             if col not in self.label_encoders:
                 self.label_encoders[col] = LabelEncoder()
@@ -3,7 +3,9 @@
 # MD5-Protected AI System. Unauthorized use prohibited.
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
+from utils.db_writer import get_writer
 from datetime import datetime
 import hashlib
 from rich.console import Console
@@ -20,8 +22,9 @@ class ModelEvaluator:
     
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_name = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
-        self._initialize_tables()
+        self.engine = get_engine(db_name)
+        self.writer = get_writer(self.engine)
+        run_schema_once(self.engine, 'model_evaluation', self._initialize_tables)
     
     def _initialize_tables(self):
         """Create evaluation tables if they don't exist"""
@@ -53,16 +56,22 @@ class ModelEvaluator:
                     )
                 """))
                 
+                # Indexes for history ordering and lookups
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_model_evaluation_log_timestamp ON model_evaluation_log (timestamp)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_model_evaluation_log_r2 ON model_evaluation_log (r2)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_model_evaluation_log_model_name ON model_evaluation_log (model_name)"))
+                
                 conn.commit()
                 
         except Exception as e:
             console.print(f"[red]Error initializing tables:[/red] {str(e)}")
+            return False
     
     def log_evaluation(self, model_name, mae, rmse, r2, md5_hash=None, 
                       training_samples=0, test_samples=0):
         """Log model evaluation results"""
         try:
-            df = pd.DataFrame([{
+            self.writer.write('model_evaluation_log', {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'model_name': model_name,
                 'mae': mae,
@@ -71,9 +80,7 @@ class ModelEvaluator:
                 'md5_hash': md5_hash or 'N/A',
                 'training_samples': training_samples,
                 'test_samples': test_samples
-            }])
-            
-            df.to_sql('model_evaluation_log', self.engine, if_exists='append', index=False)
+            })
             
             console.print(f"[green]✓ Evaluation logged:[/green] {model_name} - R²={r2:.4f}")
             return True
@@ -84,6 +91,8 @@ class ModelEvaluator:
     
     def get_evaluation_history(self, limit=10):
         """Retrieve evaluation history"""
+        # Include records still waiting in the write buffer
+        self.writer.flush()
         try:
             query = f"""
                 SELECT * FROM model_evaluation_log 
@@ -96,8 +105,19 @@ class ModelEvaluator:
             console.print(f"[red]Error retrieving history:[/red] {str(e)}")
             return pd.DataFrame()
     
+    def count_evaluations(self):
+        """Number of logged evaluations"""
+        self.writer.flush()
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(text("SELECT COUNT(*) FROM model_evaluation_log")).scalar() or 0
+        except Exception as e:
+            console.print(f"[red]Error counting evaluations:[/red] {str(e)}")
+            return 0
+    
     def get_best_model(self):
         """Get the best performing model from history"""
+        self.writer.flush()
         try:
             query = """
                 SELECT * FROM model_evaluation_log 
@@ -3,7 +3,9 @@
 # MD5-Protected AI System. Unauthorized use prohibited.
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
+from utils.db_writer import get_writer
 from datetime import datetime
 from rich.console import Console
 from rich.table import Table
@@ -19,8 +21,9 @@ class FeedbackManager:
     
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_name = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
-        self._initialize_feedback_tables()
+        self.engine = get_engine(db_name)
+        self.writer = get_writer(self.engine)
+        run_schema_once(self.engine, 'feedback', self._initialize_feedback_tables)
     
     def _initialize_feedback_tables(self):
         """Create feedback tables"""
@@ -50,10 +53,16 @@ class FeedbackManager:
                     )
                 """))
                 
+                # Indexes for history ordering and lookups
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_feedback_timestamp ON user_feedback (timestamp)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_feedback_rating ON user_feedback (rating)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_prediction_feedback_timestamp ON prediction_feedback (timestamp)"))
+                
                 conn.commit()
                 
         except Exception as e:
             console.print(f"[red]Error initializing feedback tables:[/red] {str(e)}")
+            return False
     
     def log_user_feedback(self, rating, comment, feedback_type='general', model_version='current'):
         """Log user feedback and rating"""
@@ -61,15 +70,13 @@ class FeedbackManager:
             if not 1 <= rating <= 5:
                 return False, "Rating must be between 1 and 5"
             
-            df = pd.DataFrame([{
+            self.writer.write('user_feedback', {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'rating': rating,
                 'comment': comment,
                 'feedback_type': feedback_type,
                 'model_version': model_version
-            }])
-            
-            df.to_sql('user_feedback', self.engine, if_exists='append', index=False)
+            })
             
             console.print(f"[green]✓ Feedback logged:[/green] {rating}⭐ - {comment[:50]}...")
             return True, "Feedback saved successfully"
@@ -81,15 +88,13 @@ class FeedbackManager:
     def log_prediction_feedback(self, predicted, actual, accuracy_rating, notes=''):
         """Log prediction accuracy feedback"""
         try:
-            df = pd.DataFrame([{
+            self.writer.write('prediction_feedback', {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'predicted_value': predicted,
                 'actual_value': actual,
                 'accuracy_rating': accuracy_rating,
                 'notes': notes
-            }])
-            
-            df.to_sql('prediction_feedback', self.engine, if_exists='append', index=False)
+            })
             
             console.print(f"[green]✓ Prediction feedback logged[/green]")
             return True, "Prediction feedback saved"
@@ -99,39 +104,65 @@ class FeedbackManager:
             return False, str(e)
     
     def get_feedback_summary(self):
-        """Get summary statistics of feedback"""
+        """Get summary statistics of feedback (aggregated in SQL)"""
+        # Include records still waiting in the write buffer
+        self.writer.flush()
+        empty_summary = {
+            'total_feedback': 0,
+            'average_rating': 0.0,
+            'rating_distribution': {},
+            'recent_comments': []
+        }
+        
         try:
-            query = "SELECT * FROM user_feedback"
-            df = pd.read_sql(query, self.engine)
+            with self.engine.connect() as conn:
+                total, average = conn.execute(text(
+                    "SELECT COUNT(*), AVG(rating) FROM user_feedback"
+                )).fetchone()
+                
+                if not total:
+                    return empty_summary
+                
+                distribution = conn.execute(text("""
+                    SELECT rating, COUNT(*) FROM user_feedback
+                    GROUP BY rating
+                    ORDER BY COUNT(*) DESC
+                """)).fetchall()
+                
+                # Last five entries, oldest first
+                recent = conn.execute(text("""
+                    SELECT timestamp, rating, comment FROM user_feedback
+                    ORDER BY id DESC
+                    LIMIT 5
+                """)).fetchall()
             
-            if df.empty:
-                return {
-                    'total_feedback': 0,
-                    'average_rating': 0.0,
-                    'rating_distribution': {},
-                    'recent_comments': []
-                }
-            
-            summary = {
-                'total_feedback': len(df),
-                'average_rating': df['rating'].mean(),
-                'rating_distribution': df['rating'].value_counts().to_dict(),
-                'recent_comments': df.tail(5)[['timestamp', 'rating', 'comment']].to_dict('records')
+            return {
+                'total_feedback': total,
+                'average_rating': float(average),
+                'rating_distribution': {rating: count for rating, count in distribution},
+                'recent_comments': [
+                    {'timestamp': ts, 'rating': rating, 'comment': comment}
+                    for ts, rating, comment in reversed(recent)
+                ]
             }
             
-            return summary
-            
         except Exception as e:
             console.print(f"[red]Error getting feedback summary:[/red] {str(e)}")
-            return {
-                'total_feedback': 0,
-                'average_rating': 0.0,
-                'rating_distribution': {},
-                'recent_comments': []
-            }
+            return empty_summary
+    
+    def count_feedback(self):
+        """Number of user feedback entries"""
+        self.writer.flush()
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(text("SELECT COUNT(*) FROM user_feedback")).scalar() or 0
+        except Exception as e:
+            console.print(f"[red]Error counting feedback:[/red] {str(e)}")
+            return 0
     
     def get_all_feedback(self, limit=50):
         """Get all feedback entries"""
+        self.writer.flush()
         try:
             query = f"""
                 SELECT * FROM user_feedback 
@@ -4,7 +4,9 @@
 
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
+from utils.db_writer import get_writer
 from datetime import datetime
 from rich.console import Console
 
@@ -19,8 +21,9 @@ class KnowledgeBase:
     
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_name = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
-        self._initialize_knowledge_tables()
+        self.engine = get_engine(db_name)
+        self.writer = get_writer(self.engine)
+        run_schema_once(self.engine, 'knowledge_base', self._initialize_knowledge_tables)
     
     def _initialize_knowledge_tables(self):
         """Create knowledge base tables"""
@@ -59,10 +62,85 @@ class KnowledgeBase:
                     )
                 """))
                 
+                # Indexes for history ordering and lookups
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_feature_correlations_feature_name ON feature_correlations (feature_name)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_market_insights_timestamp ON market_insights (timestamp)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_feature_importance_history_feature ON feature_importance_history (feature_name, timestamp)"))
+                
+                self._initialize_rollups(conn)
+                
                 conn.commit()
                 
         except Exception as e:
             console.print(f"[red]Error initializing knowledge tables:[/red] {str(e)}")
+            return False
+    
+    def _initialize_rollups(self, conn):
+        """Create rollup tables, backfill them once, and keep them current with triggers"""
+        existing = {row[0] for row in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'feature_%_rollup'"
+        ))}
+        
+        # Running sum/count per feature behind get_top_correlated_features
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS feature_correlation_rollup (
+                feature_name TEXT PRIMARY KEY,
+                correlation_sum REAL,
+                correlation_count INTEGER
+            )
+        """))
+        if 'feature_correlation_rollup' not in existing:
+            conn.execute(text("""
+                INSERT INTO feature_correlation_rollup
+                SELECT feature_name, SUM(correlation_with_price), COUNT(correlation_with_price)
+                FROM feature_correlations
+                WHERE correlation_with_price IS NOT NULL
+                GROUP BY feature_name
+            """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS trg_feature_correlation_rollup
+            AFTER INSERT ON feature_correlations
+            WHEN NEW.correlation_with_price IS NOT NULL
+            BEGIN
+                INSERT INTO feature_correlation_rollup VALUES (NEW.feature_name, NEW.correlation_with_price, 1)
+                ON CONFLICT(feature_name) DO UPDATE SET
+                    correlation_sum = correlation_sum + excluded.correlation_sum,
+                    correlation_count = correlation_count + 1;
+            END
+        """))
+        
+        # Daily importance per feature and model behind get_feature_importance_trends
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS feature_importance_rollup (
+                feature_name TEXT,
+                model_name TEXT,
+                day TEXT,
+                importance_sum REAL,
+                importance_count INTEGER,
+                PRIMARY KEY (feature_name, model_name, day)
+            )
+        """))
+        if 'feature_importance_rollup' not in existing:
+            conn.execute(text("""
+                INSERT INTO feature_importance_rollup
+                SELECT feature_name, model_name, substr(timestamp, 1, 10),
+                       SUM(importance_score), COUNT(importance_score)
+                FROM feature_importance_history
+                WHERE importance_score IS NOT NULL
+                GROUP BY feature_name, model_name, substr(timestamp, 1, 10)
+            """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS trg_feature_importance_rollup
+            AFTER INSERT ON feature_importance_history
+            WHEN NEW.importance_score IS NOT NULL
+            BEGIN
+                INSERT INTO feature_importance_rollup
+                VALUES (NEW.feature_name, NEW.model_name, substr(NEW.timestamp, 1, 10), NEW.importance_score, 1)
+                ON CONFLICT(feature_name, model_name, day) DO UPDATE SET
+                    importance_sum = importance_sum + excluded.importance_sum,
+                    importance_count = importance_count + 1;
+            END
+        """))
     
     def store_feature_correlations(self, df, dataset_name='current'):
         """Store feature correlations with price"""
@@ -81,19 +159,15 @@ class KnowledgeBase:
             numeric_df = df.select_dtypes(include=[np.number])
             correlations = numeric_df.corr()[price_col].drop(price_col)
             
-            # Store top correlations
-            records = []
-            for feature, corr in correlations.items():
-                records.append({
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'feature_name': feature,
-                    'correlation_with_price': corr,
-                    'dataset_name': dataset_name
-                })
+            # Store top correlations (one timestamp, built column-wise)
+            records = pd.DataFrame({
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'feature_name': correlations.index.astype(str),
+                'correlation_with_price': correlations.to_numpy(dtype=float),
+                'dataset_name': dataset_name
+            }).to_dict('records')
             
-            df_correlations = pd.DataFrame(records)
-            df_correlations.to_sql('feature_correlations', self.engine, 
-                                  if_exists='append', index=False)
+            self.writer.write_many('feature_correlations', records)
             
             console.print(f"[green]✓ Stored {len(records)} feature correlations[/green]")
             return True, None
@@ -105,18 +179,14 @@ class KnowledgeBase:
     def store_feature_importance(self, feature_importance_df, model_name):
         """Store feature importance from trained models"""
         try:
-            records = []
-            for _, row in feature_importance_df.iterrows():
-                records.append({
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'feature_name': row['feature'],
-                    'importance_score': row['importance'],
-                    'model_name': model_name
-                })
+            records = pd.DataFrame({
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'feature_name': feature_importance_df['feature'].astype(str).to_numpy(),
+                'importance_score': feature_importance_df['importance'].to_numpy(dtype=float),
+                'model_name': model_name
+            }).to_dict('records')
             
-            df_importance = pd.DataFrame(records)
-            df_importance.to_sql('feature_importance_history', self.engine,
-                                if_exists='append', index=False)
+            self.writer.write_many('feature_importance_history', records)
             
             console.print(f"[green]✓ Stored feature importance for {model_name}[/green]")
             return True
@@ -127,11 +197,12 @@ class KnowledgeBase:
     
     def get_top_correlated_features(self, top_n=5):
         """Get most correlated features across all datasets"""
+        # Include records still waiting in the write buffer
+        self.writer.flush()
         try:
             query = """
-                SELECT feature_name, AVG(correlation_with_price) as avg_correlation
-                FROM feature_correlations
-                GROUP BY feature_name
+                SELECT feature_name, correlation_sum / correlation_count as avg_correlation
+                FROM feature_correlation_rollup
                 ORDER BY ABS(avg_correlation) DESC
                 LIMIT ?
             """
@@ -142,13 +213,15 @@ class KnowledgeBase:
             return pd.DataFrame()
     
     def get_feature_importance_trends(self, feature_name):
-        """Get importance trend for a specific feature over time"""
+        """Get daily average importance of a specific feature, newest first"""
+        self.writer.flush()
         try:
             query = """
-                SELECT timestamp, importance_score, model_name
-                FROM feature_importance_history
+                SELECT day as timestamp, importance_sum / importance_count as importance_score,
+                       model_name, importance_count as samples
+                FROM feature_importance_rollup
                 WHERE feature_name = ?
-                ORDER BY timestamp DESC
+                ORDER BY day DESC
             """
             df = pd.read_sql(query, self.engine, params=(feature_name,))
             return df
@@ -159,14 +232,12 @@ class KnowledgeBase:
     def generate_market_insight(self, insight_type, insight_value, confidence=0.85):
         """Generate and store a market insight"""
         try:
-            df = pd.DataFrame([{
+            self.writer.write('market_insights', {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'insight_type': insight_type,
                 'insight_value': insight_value,
                 'confidence_score': confidence
-            }])
-            
-            df.to_sql('market_insights', self.engine, if_exists='append', index=False)
+            })
             
             console.print(f"[green]✓ Market insight generated:[/green] {insight_type}")
             return True
@@ -177,6 +248,7 @@ class KnowledgeBase:
     
     def get_all_insights(self, limit=20):
         """Get all market insights"""
+        self.writer.flush()
         try:
             query = f"""
                 SELECT * FROM market_insights
@@ -189,6 +261,16 @@ class KnowledgeBase:
             console.print(f"[red]Error retrieving insights:[/red] {str(e)}")
             return pd.DataFrame()
     
+    def count_insights(self):
+        """Number of stored market insights"""
+        self.writer.flush()
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(text("SELECT COUNT(*) FROM market_insights")).scalar() or 0
+        except Exception as e:
+            console.print(f"[red]Error counting insights:[/red] {str(e)}")
+            return 0
+    
     def analyze_dataset_and_generate_insights(self, df):
         """Analyze dataset and automatically generate insights"""
         insights_generated = []
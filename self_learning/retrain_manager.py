@@ -3,15 +3,26 @@
 # MD5-Protected AI System. Unauthorized use prohibited.
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
+from utils.db_writer import get_writer
 from datetime import datetime
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from .trainer import SelfLearningTrainer
 from .evaluator import ModelEvaluator
+from utils.database_manager import DatabaseManager
+from utils.md5_manager import fingerprint_dataframe, find_modified_blocks, modified_row_count
 
 console = Console()
 
+# Previously trained rows sampled to validate an incremental update
+INCREMENTAL_HOLDOUT_ROWS = 2000
+
+# Reasons a retrain is skipped
+DATASET_UNCHANGED = "Dataset unchanged since last retrain"
+CHANGE_BELOW_THRESHOLD = "Change below retrain threshold"
+
 
 class RetrainManager:
     """
@@ -21,10 +32,11 @@ class RetrainManager:
     
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_name = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
+        self.engine = get_engine(db_name)
+        self.writer = get_writer(self.engine)
         self.trainer = SelfLearningTrainer()
         self.evaluator = ModelEvaluator(db_name)
-        self._initialize_retrain_log()
+        run_schema_once(self.engine, 'retrain_log', self._initialize_retrain_log)
     
     def _initialize_retrain_log(self):
         """Create retrain log table"""
@@ -39,12 +51,24 @@ class RetrainManager:
                         model_trained TEXT,
                         mae REAL,
                         r2 REAL,
-                        status TEXT
+                        status TEXT,
+                        dataset_md5 TEXT
                     )
                 """))
+                
+                # Logs created before fingerprints were recorded lack the column
+                columns = [row[1] for row in conn.execute(text("PRAGMA table_info(retrain_log)"))]
+                if 'dataset_md5' not in columns:
+                    conn.execute(text("ALTER TABLE retrain_log ADD COLUMN dataset_md5 TEXT"))
+                
+                # Indexes for history ordering and lookups
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_retrain_log_timestamp ON retrain_log (timestamp)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_retrain_log_dataset_status ON retrain_log (dataset_name, status)"))
+                
                 conn.commit()
         except Exception as e:
             console.print(f"[red]Error initializing retrain log:[/red] {str(e)}")
+            return False
     
     def check_for_new_data(self):
         """Check for uploaded datasets in database"""
@@ -58,12 +82,11 @@ class RetrainManager:
             console.print(f"[red]Error checking for new data:[/red] {str(e)}")
             return []
     
-    def get_latest_dataset(self):
-        """Get the most recently uploaded dataset"""
+    def get_latest_dataset(self, columns=None):
+        """Get the most recently uploaded dataset (optionally only some columns)"""
         try:
-            # Check for main uploaded_properties table
-            query = "SELECT * FROM uploaded_properties"
-            df = pd.read_sql(query, self.engine)
+            # Served from the Parquet snapshot when current, else from SQL
+            df = DatabaseManager(self.db_name).get_saved_data('uploaded_properties', columns=columns)
             
             if not df.empty:
                 return df, 'uploaded_properties'
@@ -74,18 +97,44 @@ class RetrainManager:
             console.print(f"[yellow]No dataset found or error:[/yellow] {str(e)}")
             return None, None
     
-    def retrain_on_dataset(self, df, dataset_name='current_data'):
-        """Retrain model on specific dataset"""
+    def retrain_on_dataset(self, df, dataset_name='current_data', incremental=False, drift_threshold=0.25,
+                           dataset_md5=None, tree=None, parallel=False):
+        """
+        Retrain model on specific dataset
+        
+        With incremental=True only rows appended since the last successful
+        retrain of dataset_name are used to update the current model. A full
+        retrain runs instead when there is no usable previous model, rows
+        were removed, the new rows show drift beyond drift_threshold or the
+        update worsens the error on a sample of the old rows. Too few new
+        rows are left pending (result['buffered']) for a later run.
+        tree is df's Merkle tree (from fingerprint_dataframe), if the caller
+        already hashed the frame. parallel=True fits the candidate models of
+        a full retrain in separate processes.
+        """
         console.print(f"\n[bold cyan]🔁 Retraining on dataset:[/bold cyan] {dataset_name}")
         console.print(f"[cyan]   Records:[/cyan] {len(df)}\n")
         
+        # One hashing pass gives the fingerprint and the block tree kept for the next retrain
+        if tree is None:
+            _, tree = fingerprint_dataframe(df)
+        if dataset_md5 is None:
+            dataset_md5 = tree['fingerprint']
+        
+        if incremental:
+            success, result = self._retrain_incremental(df, dataset_name, drift_threshold, dataset_md5, tree)
+            if success:
+                self._save_tree(dataset_md5, tree)
+                return True, result
+            console.print(f"[yellow]↪ Falling back to full retrain:[/yellow] {result}")
+        
         try:
             # Train multiple models
-            result, error = self.trainer.train_multiple_models(df)
+            result, error = self.trainer.train_multiple_models(df, parallel=parallel)
             
             if error:
                 console.print(f"[red]✗ Training failed:[/red] {error}")
-                self._log_retrain(dataset_name, len(df), 'N/A', 0, 0, 'FAILED')
+                self._log_retrain(dataset_name, len(df), 'N/A', 0, 0, 'FAILED', dataset_md5)
                 return False, error
             
             # Log evaluation
@@ -105,8 +154,10 @@ class RetrainManager:
                 model=result['best_model'],
                 mae=result['mae'],
                 r2=result['r2'],
-                status='SUCCESS'
+                status='SUCCESS',
+                dataset_md5=dataset_md5
             )
+            self._save_tree(dataset_md5, tree)
             
             console.print(f"\n[bold green]✓ Retraining completed successfully![/bold green]")
             
@@ -114,11 +165,100 @@ class RetrainManager:
             
         except Exception as e:
             console.print(f"[red]✗ Retrain error:[/red] {str(e)}")
-            self._log_retrain(dataset_name, len(df), 'N/A', 0, 0, 'ERROR')
+            self._log_retrain(dataset_name, len(df), 'N/A', 0, 0, 'ERROR', dataset_md5)
             return False, str(e)
     
-    def retrain_all(self):
-        """Retrain on all available datasets"""
+    def _save_tree(self, dataset_md5, tree):
+        """Keep the block tree of a retrained dataset so the next run can diff against it"""
+        if not DatabaseManager(self.db_name).save_merkle_tree(dataset_md5, tree):
+            console.print(f"[yellow]⚠ Could not save block hashes for {dataset_md5}[/yellow]")
+    
+    def _retrain_incremental(self, df, dataset_name, drift_threshold, dataset_md5=None, tree=None):
+        """Update the current model with rows appended since the last retrain"""
+        previous = self._get_last_successful_retrain(dataset_name)
+        if previous is None:
+            return False, "No previous successful retrain"
+        
+        previous_count = previous['records_count']
+        if len(df) <= previous_count:
+            return False, "No appended rows detected"
+        
+        # Block hashes of the previous dataset confirm its rows were only appended to;
+        # full blocks compare by leaf, so only the old trailing block is rehashed
+        previous_tree = DatabaseManager(self.db_name).get_merkle_tree(previous['dataset_md5'])
+        if previous_tree is not None:
+            changed = find_modified_blocks(previous_tree, df, tree)
+            if changed:
+                return False, f"Existing rows changed in {len(changed)} block(s)"
+        
+        if self.trainer.best_model is None:
+            loaded, error = self.trainer.load_model()
+            if not loaded:
+                return False, error
+        
+        try:
+            # uploaded_properties is read in insertion order, so new rows are at the end
+            new_rows = df.iloc[previous_count:]
+            old_rows = df.iloc[:previous_count]
+            holdout = old_rows.sample(n=min(len(old_rows), INCREMENTAL_HOLDOUT_ROWS), random_state=42)
+            result, error = self.trainer.train_incremental(new_rows, holdout, drift_threshold=drift_threshold)
+            if error:
+                return False, error
+            
+            # Too few rows to train on; they stay pending until the next retrain
+            if result['buffered']:
+                return True, result
+            
+            self.evaluator.log_evaluation(
+                model_name=f"{result['best_model']} (incremental)",
+                mae=result['mae'],
+                rmse=result['rmse'],
+                r2=result['r2'],
+                training_samples=len(new_rows),
+                test_samples=len(holdout)
+            )
+            
+            self._log_retrain(
+                dataset_name=dataset_name,
+                records=len(df),
+                model=f"{result['best_model']} (incremental)",
+                mae=result['mae'],
+                r2=result['r2'],
+                status='SUCCESS',
+                dataset_md5=dataset_md5
+            )
+            
+            console.print(f"\n[bold green]✓ Incremental retraining completed ({len(new_rows)} new rows)[/bold green]")
+            return True, result
+            
+        except Exception as e:
+            return False, f"Incremental update failed: {str(e)}"
+    
+    def _get_last_successful_retrain(self, dataset_name):
+        """Record count and fingerprint of the last successful retrain for a dataset"""
+        self.writer.flush()
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text("""
+                    SELECT records_count, dataset_md5 FROM retrain_log
+                    WHERE dataset_name = :dataset_name AND status = 'SUCCESS'
+                    ORDER BY id DESC
+                    LIMIT 1
+                """), {'dataset_name': dataset_name}).fetchone()
+            if row is None:
+                return None
+            return {'records_count': int(row[0]), 'dataset_md5': row[1]}
+        except Exception as e:
+            console.print(f"[red]Error reading retrain log:[/red] {str(e)}")
+            return None
+    
+    def retrain_all(self, incremental=False, parallel=False, force=False):
+        """
+        Retrain on all available datasets
+        
+        Unless force=True, a dataset whose fingerprint matches the last
+        successful retrain is skipped with DATASET_UNCHANGED.
+        """
         console.print("\n[bold magenta]🔄 STARTING COMPREHENSIVE RETRAINING[/bold magenta]\n")
         
         # Get latest dataset
@@ -128,8 +268,15 @@ class RetrainManager:
             console.print("[yellow]⚠️  No datasets found for retraining[/yellow]")
             return False, "No data available"
         
+        _, tree = fingerprint_dataframe(df)
+        if not force:
+            skip_reason = self._skip_reason(df, dataset_name, tree)
+            if skip_reason:
+                return False, skip_reason
+        
         # Retrain on dataset
-        success, result = self.retrain_on_dataset(df, dataset_name)
+        success, result = self.retrain_on_dataset(df, dataset_name, incremental=incremental,
+                                                  dataset_md5=tree['fingerprint'], tree=tree, parallel=parallel)
         
         if success:
             console.print("\n[bold green]🎉 ALL RETRAINING COMPLETE![/bold green]\n")
@@ -137,26 +284,27 @@ class RetrainManager:
         
         return success, result
     
-    def _log_retrain(self, dataset_name, records, model, mae, r2, status):
+    def _log_retrain(self, dataset_name, records, model, mae, r2, status, dataset_md5=None):
         """Log retraining activity"""
         try:
-            df = pd.DataFrame([{
+            self.writer.write('retrain_log', {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'dataset_name': dataset_name,
                 'records_count': records,
                 'model_trained': model,
                 'mae': mae,
                 'r2': r2,
-                'status': status
-            }])
-            
-            df.to_sql('retrain_log', self.engine, if_exists='append', index=False)
+                'status': status,
+                'dataset_md5': dataset_md5
+            })
             
         except Exception as e:
             console.print(f"[red]Error logging retrain:[/red] {str(e)}")
     
     def get_retrain_history(self, limit=10):
         """Get retraining history"""
+        # Include records still waiting in the write buffer
+        self.writer.flush()
         try:
             query = f"""
                 SELECT * FROM retrain_log 
@@ -169,13 +317,64 @@ class RetrainManager:
             console.print(f"[red]Error getting retrain history:[/red] {str(e)}")
             return pd.DataFrame()
     
-    def auto_retrain_if_needed(self, threshold_samples=100):
-        """Auto retrain if dataset size exceeds threshold"""
+    def count_retrains(self, status=None):
+        """Number of logged retrains, optionally only those with a given status"""
+        self.writer.flush()
+        try:
+            with self.engine.connect() as conn:
+                if status is None:
+                    return conn.execute(text("SELECT COUNT(*) FROM retrain_log")).scalar() or 0
+                return conn.execute(
+                    text("SELECT COUNT(*) FROM retrain_log WHERE status = :status"), {'status': status}
+                ).scalar() or 0
+        except Exception as e:
+            console.print(f"[red]Error counting retrains:[/red] {str(e)}")
+            return 0
+    
+    def auto_retrain_if_needed(self, threshold_samples=100, incremental=False,
+                               min_changed_rows=0, min_changed_fraction=0.0, parallel=False):
+        """
+        Auto retrain if dataset size exceeds threshold
+        
+        Skips the retrain when the dataset fingerprint matches the last
+        successful run, or when fewer than min_changed_rows /
+        min_changed_fraction rows were edited, removed or appended since
+        then. Edits are counted per changed Merkle block; without the
+        previous run's block hashes every row counts as changed.
+        """
         df, dataset_name = self.get_latest_dataset()
         
-        if df is not None and len(df) >= threshold_samples:
-            console.print(f"[cyan]🔔 Auto-retrain triggered: {len(df)} samples detected[/cyan]")
-            return self.retrain_on_dataset(df, dataset_name)
+        if df is None or len(df) < threshold_samples:
+            return False, "Threshold not met"
         
-        return False, "Threshold not met"
-
+        _, tree = fingerprint_dataframe(df)
+        skip_reason = self._skip_reason(df, dataset_name, tree, min_changed_rows, min_changed_fraction)
+        if skip_reason:
+            return False, skip_reason
+        
+        console.print(f"[cyan]🔔 Auto-retrain triggered: {len(df)} samples detected[/cyan]")
+        return self.retrain_on_dataset(df, dataset_name, incremental=incremental, dataset_md5=tree['fingerprint'],
+                                       tree=tree, parallel=parallel)
+    
+    def _skip_reason(self, df, dataset_name, tree, min_changed_rows=0, min_changed_fraction=0.0):
+        """Why df needs no retrain since the last successful one, or None"""
+        previous = self._get_last_successful_retrain(dataset_name)
+        if previous is None:
+            return None
+        
+        dataset_md5 = tree['fingerprint']
+        if previous['dataset_md5'] == dataset_md5:
+            console.print(f"[cyan]⏭  Dataset unchanged since last retrain ({dataset_md5})[/cyan]")
+            return DATASET_UNCHANGED
+        
+        previous_tree = DatabaseManager(self.db_name).get_merkle_tree(previous['dataset_md5'])
+        if previous_tree is not None:
+            changed_rows = modified_row_count(previous_tree, df, tree)
+        else:
+            changed_rows = len(df)
+        changed_fraction = changed_rows / max(previous['records_count'], 1)
+        if changed_rows < min_changed_rows or changed_fraction < min_changed_fraction:
+            console.print(f"[cyan]⏭  Only {changed_rows} rows changed - below retrain delta[/cyan]")
+            return CHANGE_BELOW_THRESHOLD
+        
+        return None
@@ -16,11 +16,163 @@ from datetime import datetime
 from tqdm import tqdm
 from rich.console import Console
 from rich.progress import Progress
+import copy
 import hashlib
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.category_encoder import build_category_maps, encode_categoricals
 
 console = Console()
 
+# Models that run their own thread pools and share the CPU budget
+THREADED_MODELS = ('Random Forest', 'XGBoost', 'LightGBM')
+
+# Boosting stops once the validation score hasn't improved for this many rounds
+EARLY_STOPPING_ROUNDS = 20
+
+# Central coverage of the prediction intervals
+INTERVAL_CONFIDENCE = 0.95
+
+# Smaller batches of new rows are buffered until enough arrive for an update
+MIN_INCREMENTAL_ROWS = 50
+
+
+def _fit_and_score(name, model, X_train, y_train, X_test, y_test, X_val=None, y_val=None):
+    """Fit one model and compute its test metrics (runs in a worker process)"""
+    best_iteration = None
+    
+    if name == 'XGBoost' and X_val is not None:
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        best_iteration = int(model.best_iteration)
+    elif name == 'LightGBM' and X_val is not None:
+        model.fit(
+            X_train, y_train,
+            eval_set=[(X_val, y_val)],
+            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        best_iteration = int(model.best_iteration_)
+    else:
+        model.fit(X_train, y_train)
+    
+    # Predictions (boosters predict with their best iteration only)
+    y_pred = model.predict(X_test)
+    
+    # Calculate metrics
+    mae = mean_absolute_error(y_test, y_pred)
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    r2 = r2_score(y_test, y_pred)
+    
+    return name, {
+        'model': model,
+        'mae': mae,
+        'rmse': rmse,
+        'r2': r2,
+        'y_test': y_test,
+        'y_pred': y_pred,
+        'best_iteration': best_iteration
+    }
+
+
+def _interval_quantiles(confidence=INTERVAL_CONFIDENCE):
+    """Lower and upper quantiles of a central interval"""
+    tail = (1 - confidence) / 2
+    return tail, 1 - tail
+
+
+def _incremental_rounds(learning_rate, new_rows, base_rows):
+    """
+    Boosting rounds that give new rows their share of the ensemble
+    
+    k rounds at learning rate lr fit 1 - (1 - lr)^k of the new rows'
+    residual; k is chosen so that equals their share of all training rows.
+    """
+    share = new_rows / (base_rows + new_rows)
+    return max(1, int(round(np.log1p(-share) / np.log1p(-learning_rate))))
+
+
+def _leaf_table(forest):
+    """Leaf values of every tree in one flat array, plus each tree's offset into it"""
+    values = [estimator.tree_.value[:, 0, 0] for estimator in forest.estimators_]
+    offsets = np.cumsum([0] + [len(v) for v in values[:-1]])
+    return np.concatenate(values), offsets
+
+
+def _raw_intervals(name, model, interval_model, X, leaf_table=None):
+    """Point predictions and uncalibrated bounds, sharing one pass where the model allows"""
+    lower_q, upper_q = _interval_quantiles(interval_model.get('confidence', INTERVAL_CONFIDENCE))
+    
+    if name == 'Random Forest':
+        # apply() gives every tree's leaf per row; one gather turns them into per-tree predictions
+        leaf_values, offsets = leaf_table if leaf_table is not None else _leaf_table(model)
+        tree_predictions = leaf_values[model.apply(X) + offsets]
+        predictions = tree_predictions.mean(axis=1)
+        lower, upper = np.quantile(tree_predictions, [lower_q, upper_q], axis=1)
+        return predictions, lower, upper
+    
+    predictions = model.predict(X)
+    if interval_model.get('kind') == 'quantile':
+        bounds = np.column_stack([quantile_model.predict(X) for quantile_model in interval_model['models']])
+        lower, upper = bounds[:, 0], bounds[:, -1]
+        return predictions, np.minimum(lower, upper), np.maximum(lower, upper)
+    
+    return predictions, predictions, predictions
+
+
+def _fit_interval_model(name, model, X_fit, y_fit, X_val, y_val, X_test, y_test):
+    """
+    Interval estimator for the selected model, calibrated on the test split
+    
+    Random Forest needs nothing extra (its trees are the ensemble); the
+    boosters get quantile models trained like the point model. Raw bounds
+    are then widened so the held-out rows reach INTERVAL_CONFIDENCE coverage
+    (split conformal): tree spreads are scaled, quantile bounds shifted and
+    models without bounds use residual quantiles.
+    """
+    lower_q, upper_q = _interval_quantiles()
+    interval_model = {'kind': 'residuals', 'confidence': INTERVAL_CONFIDENCE, 'scale': 1.0, 'offsets': (0.0, 0.0)}
+    
+    if name == 'Random Forest':
+        interval_model['kind'] = 'trees'
+    elif name == 'XGBoost':
+        # One multi-quantile booster predicts both bounds in a single call
+        params = {**model.get_params(), 'objective': 'reg:quantileerror',
+                  'quantile_alpha': np.array([lower_q, upper_q])}
+        quantile_model = xgb.XGBRegressor(**params)
+        quantile_model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        interval_model.update(kind='quantile', models=[quantile_model])
+    elif name == 'LightGBM':
+        quantile_models = []
+        for q in (lower_q, upper_q):
+            quantile_model = lgb.LGBMRegressor(**{**model.get_params(), 'objective': 'quantile', 'alpha': q})
+            quantile_model.fit(
+                X_fit, y_fit,
+                eval_set=[(X_val, y_val)],
+                callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+            )
+            quantile_models.append(quantile_model)
+        interval_model.update(kind='quantile', models=quantile_models)
+    
+    predictions, lower, upper = _raw_intervals(name, model, interval_model, X_test)
+    y_test = np.asarray(y_test, dtype=float)
+    
+    if interval_model['kind'] == 'trees':
+        # Smallest factor on the tree spread that covers the held-out rows
+        with np.errstate(divide='ignore', invalid='ignore'):
+            below = np.where(y_test < predictions, (predictions - y_test) / (predictions - lower), 0.0)
+            above = np.where(y_test > predictions, (y_test - predictions) / (upper - predictions), 0.0)
+        scores = np.nan_to_num(np.maximum(below, above), nan=0.0, posinf=np.inf)
+        finite = scores[np.isfinite(scores)]
+        interval_model['scale'] = float(np.quantile(finite, INTERVAL_CONFIDENCE)) if len(finite) else 1.0
+    elif interval_model['kind'] == 'quantile':
+        correction = float(np.quantile(np.maximum(lower - y_test, y_test - upper), INTERVAL_CONFIDENCE))
+        interval_model['offsets'] = (-correction, correction)
+    else:
+        residuals = y_test - predictions
+        interval_model['offsets'] = tuple(float(v) for v in np.quantile(residuals, [lower_q, upper_q]))
+    
+    return interval_model
+
 
 class SelfLearningTrainer:
     """
@@ -31,11 +183,17 @@ class SelfLearningTrainer:
     def __init__(self):
         self.models = {}
         self.label_encoders = {}
+        self.category_maps = {}
         self.feature_columns = []
         self.target_column = None
         self.best_model = None
         self.best_model_name = None
+        self.best_iteration = None
+        self.best_metrics = {}
+        self.interval_model = None
+        self.training_samples = 0
         self.training_history = []
+        self._leaf_table = None
     
     def prepare_data(self, df, target_col=None):
         """Prepare data for ML training"""
@@ -59,19 +217,47 @@ class SelfLearningTrainer:
         y = df[target_col]
         
         # Handle categorical variables
-        categorical_cols = X.select_dtypes(include=['object']).columns
+        categorical_cols = X.select_dtypes(include=['object', 'category']).columns
         for col in categorical_cols:
             if col not in self.label_encoders:
                 self.label_encoders[col] = LabelEncoder()
             X[col] = self.label_encoders[col].fit_transform(X[col].astype(str))
         
+        # Lookup tables used at prediction time instead of LabelEncoder.transform
+        self.category_maps = build_category_maps(self.label_encoders)
         self.feature_columns = X.columns.tolist()
         
         console.print(f"[green]✓[/green] Data prepared: {len(X)} samples, {len(self.feature_columns)} features")
         return X, y, None
     
-    def train_multiple_models(self, df, target_col=None):
-        """Train multiple models and select the best one"""
+    def _build_models_config(self, threads_per_model=-1):
+        """Define the candidate models, each limited to threads_per_model cores"""
+        return {
+            'Random Forest': RandomForestRegressor(n_estimators=200, max_depth=15, random_state=42, n_jobs=threads_per_model),
+            'XGBoost': xgb.XGBRegressor(n_estimators=200, max_depth=8, learning_rate=0.1, random_state=42, n_jobs=threads_per_model,
+                                        early_stopping_rounds=EARLY_STOPPING_ROUNDS),
+            'LightGBM': lgb.LGBMRegressor(n_estimators=200, max_depth=8, learning_rate=0.1, random_state=42, verbose=-1, n_jobs=threads_per_model),
+            'Linear Regression': LinearRegression()
+        }
+    
+    def _fit_args(self, name, X_train, y_train, X_fit, y_fit):
+        """Boosters train on the reduced split; the rest use the full training set"""
+        if name in ('XGBoost', 'LightGBM'):
+            return X_fit, y_fit
+        return X_train, y_train
+    
+    def train_multiple_models(self, df, target_col=None, parallel=False, threads_per_model=None,
+                              filename='oracle_samuel_model.pkl'):
+        """
+        Train multiple models and select the best one
+        
+        With parallel=True every model is fitted in its own worker process.
+        threads_per_model caps the cores each threaded model may use; by
+        default the machine's cores are split evenly between them so the
+        pool never oversubscribes the box. Workers are spawned, so scripts
+        using parallel=True need an if __name__ == '__main__' guard. The best
+        model is saved to filename.
+        """
         console.print("\n[bold magenta]🧠 ORACLE SAMUEL - SELF-LEARNING MODE ACTIVATED[/bold magenta]\n")
         
         X, y, error = self.prepare_data(df, target_col)
@@ -83,63 +269,98 @@ class SelfLearningTrainer:
             X, y, test_size=0.2, random_state=42
         )
         
+        # Validation split carved from the training set drives early stopping for the boosters
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train, y_train, test_size=0.15, random_state=42
+        )
+        
         console.print(f"[cyan]Training set:[/cyan] {len(X_train)} samples")
+        console.print(f"[cyan]Validation set:[/cyan] {len(X_val)} samples (boosters early stopping)")
         console.print(f"[cyan]Test set:[/cyan] {len(X_test)} samples\n")
         
         # Define models to train
-        models_config = {
-            'Random Forest': RandomForestRegressor(n_estimators=200, max_depth=15, random_state=42, n_jobs=-1),
-            'XGBoost': xgb.XGBRegressor(n_estimators=200, max_depth=8, learning_rate=0.1, random_state=42),
-            'LightGBM': lgb.LGBMRegressor(n_estimators=200, max_depth=8, learning_rate=0.1, random_state=42, verbose=-1),
-            'Linear Regression': LinearRegression()
-        }
+        if parallel:
+            if threads_per_model is None:
+                threads_per_model = max(1, (os.cpu_count() or 1) // len(THREADED_MODELS))
+            models_config = self._build_models_config(threads_per_model)
+        else:
+            models_config = self._build_models_config(threads_per_model or -1)
         
         results = {}
         
         with Progress() as progress:
             task = progress.add_task("[cyan]Training models...", total=len(models_config))
             
-            for name, model in models_config.items():
-                console.print(f"\n[yellow]⚙️  Training {name}...[/yellow]")
+            if parallel:
+                console.print(f"\n[yellow]⚙️  Training {len(models_config)} models in parallel "
+                              f"({threads_per_model} threads each)...[/yellow]")
                 
-                try:
-                    # Train model
-                    model.fit(X_train, y_train)
-                    
-                    # Predictions
-                    y_pred = model.predict(X_test)
-                    
-                    # Calculate metrics
-                    mae = mean_absolute_error(y_test, y_pred)
-                    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-                    r2 = r2_score(y_test, y_pred)
-                    
-                    results[name] = {
-                        'model': model,
-                        'mae': mae,
-                        'rmse': rmse,
-                        'r2': r2,
-                        'y_test': y_test,
-                        'y_pred': y_pred
+                # spawn avoids inheriting OpenMP state from the parent into forked workers
+                with ProcessPoolExecutor(
+                    max_workers=len(models_config),
+                    mp_context=multiprocessing.get_context('spawn')
+                ) as executor:
+                    futures = {
+                        executor.submit(_fit_and_score, name, model, *self._fit_args(name, X_train, y_train, X_fit, y_fit),
+                                        X_test, y_test, X_val, y_val): name
+                        for name, model in models_config.items()
                     }
                     
-                    console.print(f"[green]✓ {name}:[/green] MAE={mae:.2f}, RMSE={rmse:.2f}, R²={r2:.4f}")
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        try:
+                            _, result = future.result()
+                            results[name] = result
+                            console.print(f"[green]✓ {name}:[/green] MAE={result['mae']:.2f}, "
+                                          f"RMSE={result['rmse']:.2f}, R²={result['r2']:.4f}")
+                        except Exception as e:
+                            console.print(f"[red]✗ {name} failed:[/red] {str(e)}")
+                        
+                        progress.update(task, advance=1)
+            else:
+                for name, model in models_config.items():
+                    console.print(f"\n[yellow]⚙️  Training {name}...[/yellow]")
                     
-                except Exception as e:
-                    console.print(f"[red]✗ {name} failed:[/red] {str(e)}")
-                
-                progress.update(task, advance=1)
+                    try:
+                        _, result = _fit_and_score(name, model, *self._fit_args(name, X_train, y_train, X_fit, y_fit),
+                                                   X_test, y_test, X_val, y_val)
+                        results[name] = result
+                        
+                        console.print(f"[green]✓ {name}:[/green] MAE={result['mae']:.2f}, "
+                                      f"RMSE={result['rmse']:.2f}, R²={result['r2']:.4f}")
+                        
+                    except Exception as e:
+                        console.print(f"[red]✗ {name} failed:[/red] {str(e)}")
+                    
+                    progress.update(task, advance=1)
+        
+        if not results:
+            return None, "All models failed to train"
         
         # Select best model (highest R²)
         best_name = max(results, key=lambda k: results[k]['r2'])
         self.best_model = results[best_name]['model']
         self.best_model_name = best_name
+        self.best_iteration = results[best_name]['best_iteration']
+        self.best_metrics = {k: float(results[best_name][k]) for k in ('mae', 'rmse', 'r2')}
+        self.training_samples = len(X_train)
+        
+        try:
+            self.interval_model = _fit_interval_model(
+                best_name, self.best_model, X_fit, y_fit, X_val, y_val, X_test, y_test
+            )
+        except Exception as e:
+            console.print(f"[yellow]⚠ Prediction intervals unavailable:[/yellow] {str(e)}")
+            self.interval_model = None
         
         console.print(f"\n[bold green]🏆 BEST MODEL: {best_name}[/bold green]")
-        console.print(f"[bold green]   R² Score: {results[best_name]['r2']:.4f}[/bold green]\n")
+        console.print(f"[bold green]   R² Score: {results[best_name]['r2']:.4f}[/bold green]")
+        if self.best_iteration is not None:
+            console.print(f"[bold green]   Best iteration: {self.best_iteration}[/bold green]")
+        console.print()
         
         # Save best model
-        self.save_model()
+        self.save_model(filename)
         
         # Store training history
         training_record = {
@@ -148,12 +369,138 @@ class SelfLearningTrainer:
             'mae': results[best_name]['mae'],
             'rmse': results[best_name]['rmse'],
             'r2': results[best_name]['r2'],
+            'best_iteration': self.best_iteration,
             'all_results': results
         }
         self.training_history.append(training_record)
         
         return training_record, None
     
+    def train_incremental(self, new_df, holdout_df, drift_threshold=0.25, filename='oracle_samuel_model.pkl'):
+        """
+        Update the current best model with newly added rows only
+        
+        Random Forest grows extra trees on the new rows via warm_start and
+        the boosters continue from their existing booster, with as many
+        rounds as the new rows' share of the data warrants at the model's
+        learning rate. Fewer than MIN_INCREMENTAL_ROWS rows are not trained
+        on: the record comes back with buffered=True and nothing is saved.
+        
+        holdout_df holds previously trained rows. The update is kept only if
+        the model's error on them grows by at most drift_threshold; the
+        returned mae/rmse/r2 score the updated model on them. Returns an
+        error (so the caller can run a full retrain) when the model type
+        cannot be updated in place, the artifact lacks the training size or
+        baseline metrics, the new rows drift beyond drift_threshold or the
+        update degrades the holdout.
+        """
+        if self.best_model is None:
+            return None, "No model loaded"
+        
+        if self.best_model_name not in ('Random Forest', 'XGBoost', 'LightGBM'):
+            return None, f"{self.best_model_name} does not support incremental training"
+        
+        if self.target_column not in new_df.columns:
+            return None, "Target column missing from new data"
+        
+        if holdout_df is None or holdout_df.empty or self.target_column not in holdout_df.columns:
+            return None, "No holdout rows to validate the update against"
+        
+        # Older artifacts have neither; extra trees/rounds would be sized against 1 sample
+        baseline_mae = self.best_metrics.get('mae')
+        if not self.training_samples or not baseline_mae:
+            return None, "Model artifact has no training size or baseline metrics"
+        
+        if len(new_df) < MIN_INCREMENTAL_ROWS:
+            console.print(f"[cyan]⏸  Buffering {len(new_df)} new rows until {MIN_INCREMENTAL_ROWS} arrive[/cyan]")
+            return {
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'best_model': self.best_model_name,
+                'incremental': True,
+                'buffered': True,
+                'new_samples': len(new_df)
+            }, None
+        
+        # Extend the lookup tables with unseen categories instead of refitting,
+        # so codes the existing trees were trained on stay stable
+        category_maps = {col: dict(mapping) for col, mapping in self.category_maps.items()}
+        for col, mapping in category_maps.items():
+            if col in new_df.columns:
+                for value in new_df[col].astype(str).unique():
+                    if value not in mapping:
+                        mapping[value] = len(mapping)
+        
+        X, y = self._incremental_features(new_df, category_maps)
+        X_holdout, y_holdout = self._incremental_features(holdout_df, category_maps)
+        
+        # Drift check: how well does the current model explain the new rows?
+        drift_mae = mean_absolute_error(y, self.best_model.predict(X))
+        if drift_mae > baseline_mae * (1 + drift_threshold):
+            return None, f"Drift detected: MAE on new rows {drift_mae:.2f} vs baseline {baseline_mae:.2f}"
+        
+        console.print(f"[cyan]➕ Incremental update of {self.best_model_name} with {len(X)} new rows[/cyan]")
+        
+        # Update a copy, so a rejected update leaves the served model untouched
+        model = copy.deepcopy(self.best_model)
+        base_size = self.training_samples
+        
+        if self.best_model_name == 'Random Forest':
+            extra_trees = max(1, int(round(model.n_estimators * len(X) / base_size)))
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_trees)
+            model.fit(X, y)
+        elif self.best_model_name == 'XGBoost':
+            # Slicing the booster to best_iteration drops its base score, so continue from the whole booster
+            booster = model.get_booster()
+            extra_rounds = _incremental_rounds(model.get_params()['learning_rate'] or 0.3, len(X), base_size)
+            model.set_params(n_estimators=extra_rounds, early_stopping_rounds=None)
+            model.fit(X, y, xgb_model=booster, verbose=False)
+            # The continued booster inherits best_iteration, which would pin predict to the old rounds
+            model.get_booster().set_attr(best_iteration=None, best_score=None)
+        else:
+            booster = model.booster_
+            init_model = lgb.Booster(model_str=booster.model_to_string(num_iteration=self.best_iteration))
+            extra_rounds = _incremental_rounds(model.get_params()['learning_rate'], len(X), base_size)
+            model.set_params(n_estimators=extra_rounds)
+            model.fit(X, y, init_model=init_model)
+        
+        holdout_before = mean_absolute_error(y_holdout, self.best_model.predict(X_holdout))
+        y_pred = model.predict(X_holdout)
+        holdout_mae = mean_absolute_error(y_holdout, y_pred)
+        if holdout_mae > holdout_before * (1 + drift_threshold):
+            return None, f"Update degraded holdout MAE from {holdout_before:.2f} to {holdout_mae:.2f}"
+        
+        # The updated model uses all of its trees
+        self.best_model = model
+        self.category_maps = category_maps
+        self.best_iteration = None
+        self.training_samples += len(X)
+        self.save_model(filename)
+        
+        training_record = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'best_model': self.best_model_name,
+            'mae': holdout_mae,
+            'rmse': np.sqrt(mean_squared_error(y_holdout, y_pred)),
+            'r2': r2_score(y_holdout, y_pred) if len(y_holdout) > 1 else 0.0,
+            'holdout_mae_before': holdout_before,
+            'best_iteration': None,
+            'incremental': True,
+            'buffered': False,
+            'drift_mae': drift_mae,
+            'new_samples': len(X)
+        }
+        self.training_history.append(training_record)
+        
+        return training_record, None
+    
+    def _incremental_features(self, df, category_maps):
+        """Encode rows for an incremental update and split off the target"""
+        X = encode_categoricals(df.drop(columns=[self.target_column]).copy(), category_maps)
+        for col in self.feature_columns:
+            if col not in X.columns:
+                X[col] = 0
+        return X[self.feature_columns], df[self.target_column]
+    
     def save_model(self, filename='oracle_samuel_model.pkl'):
         """Save the best model to disk"""
         if self.best_model is None:
@@ -163,13 +510,21 @@ class SelfLearningTrainer:
             model_data = {
                 'model': self.best_model,
                 'model_name': self.best_model_name,
+                'best_iteration': self.best_iteration,
+                'metrics': self.best_metrics,
+                'interval_model': self.interval_model,
+                'training_samples': self.training_samples,
                 'label_encoders': self.label_encoders,
+                'category_maps': self.category_maps,
                 'feature_columns': self.feature_columns,
                 'target_column': self.target_column,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
-            joblib.dump(model_data, filename)
+            # Write to a temp file and swap it in so readers never see a partial artifact
+            tmp_filename = f"{filename}.tmp"
+            joblib.dump(model_data, tmp_filename)
+            os.replace(tmp_filename, filename)
             
             # Calculate MD5
             with open(filename, 'rb') as f:
@@ -189,39 +544,110 @@ class SelfLearningTrainer:
         
         try:
             model_data = joblib.load(filename)
-            self.best_model = model_data['model']
-            self.best_model_name = model_data['model_name']
-            self.label_encoders = model_data['label_encoders']
-            self.feature_columns = model_data['feature_columns']
-            self.target_column = model_data['target_column']
+            self.restore_model_data(model_data)
             
             console.print(f"[green]✓ Model loaded:[/green] {self.best_model_name}")
             return True, None
         except Exception as e:
             return False, str(e)
     
+    def restore_model_data(self, model_data):
+        """Restore trainer state from a saved model artifact"""
+        self.best_model = model_data['model']
+        self.best_model_name = model_data['model_name']
+        self.best_iteration = model_data.get('best_iteration')
+        self.best_metrics = model_data.get('metrics', {})
+        self.interval_model = model_data.get('interval_model')
+        self._leaf_table = None
+        self.training_samples = model_data.get('training_samples', 0)
+        self.label_encoders = model_data['label_encoders']
+        # Artifacts saved before lookup tables existed are compiled on load
+        self.category_maps = model_data.get('category_maps') or build_category_maps(self.label_encoders)
+        self.feature_columns = model_data['feature_columns']
+        self.target_column = model_data['target_column']
+    
+    @property
+    def model(self):
+        """The selected model, under the name RealEstatePredictor uses"""
+        return self.best_model
+    
     def predict(self, input_data):
         """Make predictions with loaded model"""
+        predictions, error = self.predict_batch(pd.DataFrame([input_data]))
+        if error:
+            return None, error
+        
+        return round(predictions[0], 2), None
+    
+    def missing_features(self, columns):
+        """Feature columns the model was trained on that are absent from columns"""
+        present = set(columns)
+        return [col for col in self.feature_columns if col not in present]
+    
+    def _prepare_features(self, df):
+        """Encode and align a frame to the model's feature columns"""
+        missing = self.missing_features(df.columns)
+        if missing:
+            # Zero-filling would silently skew every prediction
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        
+        X = df[self.feature_columns].copy()
+        
+        # Encode categoricals via lookup tables; unseen values fall into their own bucket
+        encode_categoricals(X, self.category_maps)
+        
+        return X
+    
+    def predict_batch(self, df):
+        """Score a whole DataFrame with a single model call"""
+        if self.best_model is None:
+            return None, "No model loaded"
+        
+        try:
+            X = self._prepare_features(df)
+            predictions = self.best_model.predict(X)
+            
+            return np.round(predictions, 2), None
+        except Exception as e:
+            return None, f"Prediction error: {str(e)}"
+    
+    def predict_batch_with_intervals(self, df):
+        """
+        Score a DataFrame with lower/upper bounds at INTERVAL_CONFIDENCE
+        
+        Returns ((predictions, lower, upper), error). Random Forest yields the
+        point prediction and its interval from the same per-tree pass;
+        boosters add one call per quantile model; other models shift the
+        prediction by held-out residual quantiles. Artifacts saved without a
+        calibrated interval model get lower and upper of None: their raw
+        spreads do not reach INTERVAL_CONFIDENCE.
+        """
         if self.best_model is None:
             return None, "No model loaded"
         
         try:
-            X = pd.DataFrame([input_data])
+            X = self._prepare_features(df)
+            interval_model = self.interval_model
+            if not interval_model:
+                return (np.round(self.best_model.predict(X), 2), None, None), None
             
-            # Apply label encoding
-            for col, encoder in self.label_encoders.items():
-                if col in X.columns:
-                    X[col] = encoder.transform(X[col].astype(str))
+            leaf_table = None
+            if self.best_model_name == 'Random Forest':
+                # Cached until incremental training grows the forest
+                n_trees = len(self.best_model.estimators_)
+                if self._leaf_table is None or self._leaf_table[0] != n_trees:
+                    self._leaf_table = (n_trees, _leaf_table(self.best_model))
+                leaf_table = self._leaf_table[1]
             
-            # Ensure all feature columns exist
-            for col in self.feature_columns:
-                if col not in X.columns:
-                    X[col] = 0
+            predictions, lower, upper = _raw_intervals(
+                self.best_model_name, self.best_model, interval_model, X, leaf_table
+            )
             
-            X = X[self.feature_columns]
-            prediction = self.best_model.predict(X)[0]
+            scale = interval_model['scale']
+            lower = predictions - (predictions - lower) * scale + interval_model['offsets'][0]
+            upper = predictions + (upper - predictions) * scale + interval_model['offsets'][1]
             
-            return round(prediction, 2), None
+            lower, upper = np.minimum(lower, predictions), np.maximum(upper, predictions)
+            return (np.round(predictions, 2), np.round(lower, 2), np.round(upper, 2)), None
         except Exception as e:
             return None, f"Prediction error: {str(e)}"
-
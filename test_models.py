@@ -398,6 +398,474 @@ try:
 except Exception as e:
     test_result("Data Cleaner", False, str(e))
 
+# =============================================================================
+# TEST 12: Calibrated Prediction Intervals
+# =============================================================================
+print("TEST 12: Calibrated Prediction Intervals")
+print("-" * 80)
+
+try:
+    import tempfile
+    import shutil
+    from self_learning.trainer import SelfLearningTrainer, INTERVAL_CONFIDENCE
+
+    def interval_data(n):
+        sqft = np.random.randint(500, 5000, n)
+        bedrooms = np.random.randint(1, 6, n)
+        noise = np.random.normal(0, 40000, n)
+        return pd.DataFrame({
+            'sqft': sqft,
+            'bedrooms': bedrooms,
+            'price': 150 * sqft + 60000 * np.sin(sqft / 400) * bedrooms + noise
+        })
+
+    # train_multiple_models saves its artifact to the working directory
+    work_dir = tempfile.mkdtemp()
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        trainer = SelfLearningTrainer()
+        trainer.train_multiple_models(interval_data(1500), target_col='price')
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Fresh rows from the same distribution land inside their interval at the stated rate
+    holdout = interval_data(2000)
+    (predictions, lower, upper), error = trainer.predict_batch_with_intervals(holdout.drop(columns=['price']))
+    coverage = float(np.mean((holdout['price'] >= lower) & (holdout['price'] <= upper)))
+
+    if error is None and coverage >= INTERVAL_CONFIDENCE - 0.05:
+        test_result("Prediction Interval Coverage", True,
+                    f"{trainer.best_model_name}: {coverage:.1%} coverage at {INTERVAL_CONFIDENCE:.0%}")
+    else:
+        test_result("Prediction Interval Coverage", False,
+                    f"{trainer.best_model_name}: {coverage:.1%} coverage, error: {error}")
+
+    # Artifacts without a calibrated interval model report no interval at all
+    trainer.interval_model = None
+    (fallback_predictions, fallback_lower, fallback_upper), error = \
+        trainer.predict_batch_with_intervals(holdout.drop(columns=['price']))
+
+    if error is None and fallback_lower is None and fallback_upper is None and \
+            np.allclose(fallback_predictions, predictions, atol=0.01):
+        test_result("Prediction Interval Fallback", True, "No interval without calibration")
+    else:
+        test_result("Prediction Interval Fallback", False, f"Lower: {fallback_lower}, error: {error}")
+
+except Exception as e:
+    test_result("Calibrated Prediction Intervals", False, str(e))
+
+# =============================================================================
+# TEST 13: Incremental Training
+# =============================================================================
+print("TEST 13: Incremental Training")
+print("-" * 80)
+
+try:
+    import tempfile
+    import shutil
+    from self_learning.trainer import SelfLearningTrainer, MIN_INCREMENTAL_ROWS
+
+    def incremental_data(n):
+        sqft = np.random.randint(500, 5000, n)
+        bedrooms = np.random.randint(1, 6, n)
+        noise = np.random.normal(0, 20000, n)
+        return pd.DataFrame({
+            'sqft': sqft,
+            'bedrooms': bedrooms,
+            'price': 200000 + 150 * sqft + 60000 * np.sin(sqft / 400) * bedrooms + noise
+        })
+
+    work_dir = tempfile.mkdtemp()
+    base_df = incremental_data(1000)
+    holdout = incremental_data(2000)
+    holdout_X = holdout.drop(columns=['price'])
+
+    def holdout_mae(trainer):
+        predictions, _ = trainer.predict_batch(holdout_X)
+        return float(np.mean(np.abs(predictions - holdout['price'])))
+
+    try:
+        for name in ('Random Forest', 'XGBoost', 'LightGBM'):
+            model_path = os.path.join(work_dir, f"{name.replace(' ', '_')}.pkl")
+
+            # Only this model competes, so it is the one updated below
+            trainer = SelfLearningTrainer()
+            build_models = trainer._build_models_config
+            trainer._build_models_config = lambda threads_per_model=-1, build=build_models, name=name: \
+                {name: build(threads_per_model)[name]}
+            trainer.train_multiple_models(base_df, target_col='price', filename=model_path)
+            mae_before = holdout_mae(trainer)
+
+            # A handful of rows is buffered and leaves the model as it was
+            record, error = trainer.train_incremental(incremental_data(1), base_df, filename=model_path)
+            buffered = error is None and record['buffered'] and holdout_mae(trainer) == mae_before
+
+            # A small batch must not make the model much worse on unseen rows
+            record, error = trainer.train_incremental(incremental_data(MIN_INCREMENTAL_ROWS), base_df,
+                                                      filename=model_path)
+            mae_after = holdout_mae(trainer)
+
+            if buffered and error is None and not record['buffered'] and mae_after <= mae_before * 1.05:
+                test_result(f"Incremental {name}", True,
+                            f"Holdout MAE {mae_before:,.0f} -> {mae_after:,.0f}")
+            else:
+                test_result(f"Incremental {name}", False,
+                            f"Buffered: {buffered}, error: {error}, holdout MAE {mae_before:,.0f} -> {mae_after:,.0f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+except Exception as e:
+    test_result("Incremental Training", False, str(e))
+
+# =============================================================================
+# TEST 14: Chunked CSV Ingestion
+# =============================================================================
+print("TEST 14: Chunked CSV Ingestion")
+print("-" * 80)
+
+try:
+    import io
+    import shutil
+    import tempfile
+    from utils.data_cleaner import DataCleaner
+    from utils.data_ingestion import ingest_csv
+    from utils.database_manager import DatabaseManager
+
+    ingest_dir = tempfile.mkdtemp()
+    ingest_db = DatabaseManager(os.path.join(ingest_dir, 'ingest.db'))
+
+    ingest_df = pd.DataFrame({
+        'price': np.random.randint(100000, 1000000, 12000).astype(float),
+        'sqft': np.random.randint(500, 5000, 12000).astype(object),
+        'city': np.random.choice(['Haifa', 'Tel Aviv', 'Eilat'], 12000)
+    })
+
+    # A placeholder past the dtype sample becomes a missing value instead of failing the upload
+    ingest_df.loc[11000, 'sqft'] = '-'
+    success, result = ingest_csv(io.StringIO(ingest_df.to_csv(index=False)), ingest_db, chunk_rows=5000)
+    stored = ingest_db.get_saved_data()
+
+    if success and len(stored) == result['rows_saved'] and pd.api.types.is_numeric_dtype(stored['sqft']):
+        test_result("Ingest Tolerates Stray Values", True, f"{result['rows_saved']} rows stored")
+    else:
+        test_result("Ingest Tolerates Stray Values", False, str(result))
+
+    # Rows repeated across chunks are removed like whole-file duplicates
+    unique_df = ingest_df.drop(index=11000).iloc[:6000].reset_index(drop=True)
+    repeated_df = pd.concat([unique_df, unique_df.iloc[:1000]], ignore_index=True)
+    success, result = ingest_csv(io.StringIO(repeated_df.to_csv(index=False)), ingest_db, chunk_rows=2500)
+
+    # Fills and outlier bounds are per chunk: the result matches cleaning each chunk on its own
+    expected_rows = sum(
+        len(DataCleaner(unique_df.iloc[start:start + 2500].astype({'sqft': float})).clean_data()[0])
+        for start in range(0, len(unique_df), 2500)
+    )
+
+    if success and result['rows_read'] == 7000 and result['rows_saved'] == expected_rows:
+        test_result("Ingest Cross-Chunk Duplicates", True,
+                    f"{result['rows_read']} rows read, {result['rows_saved']} saved")
+    else:
+        test_result("Ingest Cross-Chunk Duplicates", False,
+                    f"Saved {result['rows_saved'] if success else result}, expected {expected_rows}")
+
+    shutil.rmtree(ingest_dir, ignore_errors=True)
+
+except Exception as e:
+    test_result("Chunked CSV Ingestion", False, str(e))
+
+# =============================================================================
+# TEST 15: Parallel Training
+# =============================================================================
+print("TEST 15: Parallel Training")
+print("-" * 80)
+
+try:
+    import json
+    import shutil
+    import subprocess
+    import tempfile
+
+    # Spawned workers re-import the main module, so the pool runs from a guarded driver script
+    PARALLEL_DRIVER = """
+import json
+import sys
+import pandas as pd
+
+sys.path.insert(0, sys.argv[1])
+from self_learning.trainer import SelfLearningTrainer
+from self_learning.retrain_manager import RetrainManager
+
+def scores(record):
+    return {name: {metric: float(result[metric]) for metric in ('mae', 'rmse', 'r2')}
+            for name, result in record['all_results'].items()}
+
+if __name__ == '__main__':
+    df = pd.read_csv('parallel.csv')
+    # Same thread budget either way, so only the process pool differs
+    serial, _ = SelfLearningTrainer().train_multiple_models(df, target_col='price', threads_per_model=2,
+                                                            filename='serial.pkl')
+    pooled, _ = SelfLearningTrainer().train_multiple_models(df, target_col='price', parallel=True,
+                                                            threads_per_model=2, filename='parallel.pkl')
+    # The retrain flow hands the flag on to the trainer
+    success, retrained = RetrainManager('retrain.db').retrain_on_dataset(df, 'parallel_data', parallel=True)
+
+    with open('parallel.json', 'w') as f:
+        json.dump({
+            'serial': {'best_model': serial['best_model'], 'scores': scores(serial)},
+            'parallel': {'best_model': pooled['best_model'], 'scores': scores(pooled)},
+            'retrain': {'success': success, 'best_model': retrained['best_model'] if success else None}
+        }, f)
+"""
+
+    parallel_dir = tempfile.mkdtemp()
+    parallel_df = pd.DataFrame({
+        'sqft': np.random.randint(500, 5000, 800),
+        'bedrooms': np.random.randint(1, 6, 800),
+        'city': np.random.choice(['Haifa', 'Tel Aviv', 'Eilat'], 800)
+    })
+    parallel_df['price'] = 100000 + 200 * parallel_df['sqft'] + 30000 * parallel_df['bedrooms'] + \
+        np.random.normal(0, 25000, 800)
+
+    try:
+        parallel_df.to_csv(os.path.join(parallel_dir, 'parallel.csv'), index=False)
+        with open(os.path.join(parallel_dir, 'driver.py'), 'w') as f:
+            f.write(PARALLEL_DRIVER)
+
+        subprocess.run([sys.executable, 'driver.py', os.path.dirname(os.path.abspath(__file__))],
+                       cwd=parallel_dir, capture_output=True, timeout=900)
+        with open(os.path.join(parallel_dir, 'parallel.json')) as f:
+            runs = json.load(f)
+
+        serial, pooled = runs['serial'], runs['parallel']
+        same_scores = serial['scores'].keys() == pooled['scores'].keys() and all(
+            np.isclose(serial['scores'][name][metric], pooled['scores'][name][metric])
+            for name in serial['scores'] for metric in ('mae', 'rmse', 'r2')
+        )
+
+        if serial['best_model'] == pooled['best_model'] and same_scores:
+            test_result("Parallel Matches Serial", True,
+                        f"Best model {pooled['best_model']}; {len(pooled['scores'])} models scored alike")
+        else:
+            test_result("Parallel Matches Serial", False, f"Serial {serial}, parallel {pooled}")
+
+        if runs['retrain']['success'] and runs['retrain']['best_model'] == serial['best_model']:
+            test_result("Parallel Retrain", True, f"Best model {runs['retrain']['best_model']}")
+        else:
+            test_result("Parallel Retrain", False, str(runs['retrain']))
+    finally:
+        shutil.rmtree(parallel_dir, ignore_errors=True)
+
+except Exception as e:
+    test_result("Parallel Training", False, str(e))
+
+# =============================================================================
+# TEST 16: Retrain Change Detection
+# =============================================================================
+print("TEST 16: Retrain Change Detection")
+print("-" * 80)
+
+try:
+    import tempfile
+    import shutil
+    from self_learning.retrain_manager import RetrainManager, DATASET_UNCHANGED, CHANGE_BELOW_THRESHOLD
+    from utils.database_manager import DatabaseManager
+
+    def listing_data(n):
+        sqft = np.random.randint(500, 5000, n)
+        bedrooms = np.random.randint(1, 6, n)
+        return pd.DataFrame({
+            'sqft': sqft,
+            'bedrooms': bedrooms,
+            'price': 200000 + 150 * sqft + 60000 * np.sin(sqft / 400) * bedrooms + np.random.normal(0, 20000, n)
+        })
+
+    # Retrains save the model to the working directory
+    retrain_dir = tempfile.mkdtemp()
+    previous_dir = os.getcwd()
+    os.chdir(retrain_dir)
+
+    try:
+        retrain_db = os.path.join(retrain_dir, 'retrain.db')
+        DatabaseManager(retrain_db).save_uploaded_data(listing_data(800))
+        retrain_manager = RetrainManager(retrain_db)
+
+        first, _ = retrain_manager.retrain_all()
+        repeat, repeat_reason = retrain_manager.retrain_all()
+        auto, auto_reason = retrain_manager.auto_retrain_if_needed(threshold_samples=10)
+
+        if first and not repeat and repeat_reason == DATASET_UNCHANGED and not auto and \
+                auto_reason == DATASET_UNCHANGED and retrain_manager.count_retrains('SUCCESS') == 1:
+            test_result("Unchanged Dataset Skipped", True, "Second retrain skipped on the same fingerprint")
+        else:
+            test_result("Unchanged Dataset Skipped", False, f"Repeat: {repeat_reason}, auto: {auto_reason}")
+
+        # Appended rows below the configured delta are skipped; otherwise they update the model
+        DatabaseManager(retrain_db).append_rows(listing_data(60))
+        below, below_reason = retrain_manager.auto_retrain_if_needed(threshold_samples=10, min_changed_rows=100)
+        updated, update = retrain_manager.retrain_all(incremental=True)
+
+        if not below and below_reason == CHANGE_BELOW_THRESHOLD and updated and update.get('incremental') and \
+                update['new_samples'] == 60 and retrain_manager.retrain_all()[1] == DATASET_UNCHANGED:
+            test_result("Appended Rows Retrained Incrementally", True,
+                        f"{update['new_samples']} rows added to {update['best_model']}")
+        else:
+            test_result("Appended Rows Retrained Incrementally", False, f"Below: {below_reason}, update: {update}")
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(retrain_dir, ignore_errors=True)
+
+except Exception as e:
+    test_result("Retrain Change Detection", False, str(e))
+
+# =============================================================================
+# TEST 17: Categorical Lookup Tables
+# =============================================================================
+print("TEST 17: Categorical Lookup Tables")
+print("-" * 80)
+
+try:
+    import tempfile
+    import shutil
+    import joblib
+    from self_learning.trainer import SelfLearningTrainer
+    from utils.category_encoder import build_category_maps, encode_categoricals, UNSEEN_CATEGORY_CODE
+
+    category_df = pd.DataFrame({
+        'sqft': np.random.randint(500, 5000, 500).astype(float),
+        'city': np.random.choice(['Haifa', 'Tel Aviv', 'Eilat'], 500),
+        'district': np.random.choice(['North', 'South', 'Center'], 500)
+    })
+    category_df['price'] = category_df['sqft'] * 200 + category_df['city'].map(
+        {'Haifa': 0, 'Tel Aviv': 300000, 'Eilat': 100000}) + np.random.normal(0, 30000, 500)
+
+    category_dir = tempfile.mkdtemp()
+    try:
+        model_path = os.path.join(category_dir, 'category_model.pkl')
+        trainer = SelfLearningTrainer()
+        trainer.train_multiple_models(category_df, target_col='price', filename=model_path)
+
+        # Seen values get the LabelEncoder's codes; every unseen value gets the same bucket
+        queries = pd.DataFrame({
+            'sqft': [1500.0] * 4,
+            'city': ['Haifa', 'Jerusalem', 'Nazareth', None],
+            'district': ['North', 'North', 'North', 'North']
+        })
+        encoded = encode_categoricals(queries.copy(), trainer.category_maps)
+        seen_code = trainer.label_encoders['city'].transform(['Haifa'])[0]
+
+        if encoded['city'].tolist() == [seen_code] + [UNSEEN_CATEGORY_CODE] * 3:
+            test_result("Unseen Categories Share a Bucket", True, f"Codes: {encoded['city'].tolist()}")
+        else:
+            test_result("Unseen Categories Share a Bucket", False, f"Codes: {encoded['city'].tolist()}")
+
+        # Unseen cities score without raising, identically to each other, alone or in a batch
+        batch, error = trainer.predict_batch(queries)
+        singles = [trainer.predict(row)[0] for row in queries.to_dict('records')]
+
+        if error is None and batch[1] == batch[2] == batch[3] and np.allclose(batch, singles):
+            test_result("Unseen Categories Predict Consistently", True, f"Unseen city -> ${batch[1]:,.0f}")
+        else:
+            test_result("Unseen Categories Predict Consistently", False, f"Batch {batch}, singles {singles}, {error}")
+
+        # Artifacts saved before lookup tables existed compile the same tables on load
+        model_data = joblib.load(model_path)
+        del model_data['category_maps']
+        legacy = SelfLearningTrainer()
+        legacy.restore_model_data(model_data)
+
+        if legacy.category_maps == trainer.category_maps == build_category_maps(trainer.label_encoders) and \
+                np.array_equal(legacy.predict_batch(queries)[0], batch):
+            test_result("Legacy Artifact Lookup Tables", True, f"{len(legacy.category_maps)} tables rebuilt")
+        else:
+            test_result("Legacy Artifact Lookup Tables", False, "Rebuilt tables differ")
+    finally:
+        shutil.rmtree(category_dir, ignore_errors=True)
+
+except Exception as e:
+    test_result("Categorical Lookup Tables", False, str(e))
+
+# =============================================================================
+# TEST 18: Similar Properties Index
+# =============================================================================
+print("TEST 18: Similar Properties Index")
+print("-" * 80)
+
+try:
+    import tempfile
+    from utils.similarity_index import SimilarityIndex, MIN_PARTITION_ROWS
+
+    listing_df = pd.DataFrame({
+        'area': np.random.uniform(40, 250, 3000),
+        'rooms': np.random.uniform(1, 7, 3000),
+        'floor': np.random.uniform(0, 20, 3000),
+        'city': np.random.choice(['Haifa', 'Tel Aviv', 'Eilat'], 3000),
+        'district': np.random.choice(['North', 'South', 'Center'], 3000),
+        'price': np.random.uniform(500000, 3000000, 3000)
+    })
+    # Too few rows for its own tree: queries fall back to the whole city
+    listing_df.loc[:MIN_PARTITION_ROWS - 3, ['city', 'district']] = ['Eilat', 'Marina']
+    features = ['area', 'rooms', 'floor']
+    index = SimilarityIndex.build(listing_df, 'price', feature_columns=features)
+
+    values = listing_df[features].to_numpy()
+    scaled = (values - values.mean(axis=0)) / values.std(axis=0)
+
+    def brute_force(query, mask, k=5):
+        """Nearest rows by a full scan of the standardized rows in mask"""
+        point = (query[features].to_numpy(dtype=float) - values.mean(axis=0)) / values.std(axis=0)
+        distances = np.linalg.norm(scaled[mask] - point, axis=1)
+        return list(listing_df.index[mask][np.argsort(distances, kind='stable')[:k]])
+
+    queries = pd.DataFrame({
+        'area': np.random.uniform(40, 250, 20),
+        'rooms': np.random.uniform(1, 7, 20),
+        'floor': np.random.uniform(0, 20, 20),
+        'city': np.random.choice(['Haifa', 'Tel Aviv', 'Eilat'], 20),
+        'district': np.random.choice(['North', 'South', 'Center'], 20)
+    })
+    results = index.query(queries, k=5)
+    matches = [
+        [n['row'] for n in result] == brute_force(
+            query, ((listing_df['city'] == query['city']) & (listing_df['district'] == query['district'])).to_numpy())
+        and all(n['match_level'] == 'district' for n in result)
+        for (_, query), result in zip(queries.iterrows(), results)
+    ]
+
+    if all(matches):
+        test_result("Index Matches Brute Force", True, f"{len(matches)} queries within their (city, district)")
+    else:
+        test_result("Index Matches Brute Force", False, f"{matches.count(False)} queries differ")
+
+    # Small or blank districts fall back to the city partition
+    fallback = queries.head(2).assign(city='Eilat', district=['Marina', ''])
+    city_mask = (listing_df['city'] == 'Eilat').to_numpy()
+    fallback_results = index.query(fallback, k=5)
+
+    if all([n['row'] for n in result] == brute_force(query, city_mask) and result[0]['match_level'] == 'city'
+           for (_, query), result in zip(fallback.iterrows(), fallback_results)):
+        test_result("Index Partition Fallback", True, "Small and blank districts searched city-wide")
+    else:
+        test_result("Index Partition Fallback", False, str([r[0]['match_level'] for r in fallback_results]))
+
+    # The persisted index answers like the one in memory
+    index_file = tempfile.NamedTemporaryFile(delete=False, suffix='.neighbors.pkl')
+    index_file.close()
+    try:
+        index.save(index_file.name)
+        reloaded = SimilarityIndex.load(index_file.name).query(queries, k=5)
+    finally:
+        os.unlink(index_file.name)
+
+    if reloaded == results:
+        test_result("Index Persistence", True, f"{index.size} rows, {len(index.trees)} trees")
+    else:
+        test_result("Index Persistence", False, "Reloaded index answers differently")
+
+except Exception as e:
+    test_result("Similar Properties Index", False, str(e))
+
 # =============================================================================
 # FINAL SUMMARY
 # =============================================================================
@@ -431,6 +899,13 @@ else:
     print("  [PASS] SHAP explainability working")
     print("  [PASS] Model persistence working")
     print("  [PASS] Data cleaning integration working")
+    print("  [PASS] Calibrated prediction intervals working")
+    print("  [PASS] Incremental training keeps holdout error")
+    print("  [PASS] Chunked CSV ingestion working")
+    print("  [PASS] Parallel training matches serial")
+    print("  [PASS] Unchanged datasets skip retraining")
+    print("  [PASS] Unseen categories encoded consistently")
+    print("  [PASS] Similar properties match a brute-force scan")
     print()
     print("All models are ready for deployment!")
     sys.exit(0)
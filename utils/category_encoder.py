@@ -0,0 +1,30 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import numpy as np
+
+
+# Code assigned to categories the encoder never saw during training
+UNSEEN_CATEGORY_CODE = -1
+
+
+def build_category_maps(label_encoders):
+    """Compile fitted LabelEncoders into plain dict lookup tables"""
+    return {
+        col: {str(value): code for code, value in enumerate(encoder.classes_)}
+        for col, encoder in label_encoders.items()
+    }
+
+
+def encode_categoricals(X, category_maps):
+    """Encode categorical columns in place with constant-time lookups"""
+    for col, mapping in category_maps.items():
+        if col in X.columns:
+            X[col] = (
+                X[col].astype(str)
+                .map(mapping)
+                .fillna(UNSEEN_CATEGORY_CODE)
+                .astype(np.int64)
+            )
+    return X
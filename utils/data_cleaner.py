@@ -7,24 +7,34 @@ import numpy as np
 from datetime import datetime
 
 
+def standardize_column_names(columns):
+    """Lowercase snake_case column names, as used for training"""
+    return pd.Index(columns).str.lower().str.replace(' ', '_').str.replace('[^a-z0-9_]', '', regex=True)
+
+
 class DataCleaner:
-    def __init__(self, df):
-        self.df = df.copy()
+    def __init__(self, df, copy=True):
+        # Callers that own the frame (e.g. chunked ingestion) can skip the defensive copy
+        self.df = df.copy() if copy else df
         self.cleaning_report = []
+        self.outlier_counts = {}
+        self.memory_report = {}
     
-    def clean_data(self):
+    def clean_data(self, optimize_memory=True):
         """Main cleaning pipeline"""
         self._standardize_column_names()
         self._handle_missing_values()
         self._remove_duplicates()
         self._validate_data_types()
         self._remove_outliers()
+        if optimize_memory:
+            self._optimize_memory()
         return self.df, self.cleaning_report
     
     def _standardize_column_names(self):
         """Standardize column names to lowercase with underscores"""
         original_cols = self.df.columns.tolist()
-        self.df.columns = self.df.columns.str.lower().str.replace(' ', '_').str.replace('[^a-z0-9_]', '', regex=True)
+        self.df.columns = standardize_column_names(self.df.columns)
         self.cleaning_report.append(f"✓ Standardized {len(original_cols)} column names")
     
     def _handle_missing_values(self):
@@ -69,33 +79,69 @@ class DataCleaner:
     
     def _remove_outliers(self):
         """Remove extreme outliers using IQR method"""
-        numeric_cols = self.df.select_dtypes(include=[np.number]).columns
-        outliers_removed = 0
+        numeric_df = self.df.select_dtypes(include=[np.number])
+        if numeric_df.empty:
+            self.cleaning_report.append("✓ No significant outliers detected")
+            return
         
-        for col in numeric_cols:
-            Q1 = self.df[col].quantile(0.25)
-            Q3 = self.df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 3 * IQR
-            upper_bound = Q3 + 3 * IQR
-            
-            before_count = len(self.df)
-            self.df = self.df[(self.df[col] >= lower_bound) & (self.df[col] <= upper_bound)]
-            outliers_removed += (before_count - len(self.df))
+        # Bounds for every column from a single quantile pass over the original data
+        quartiles = numeric_df.quantile([0.25, 0.75])
+        Q1 = quartiles.loc[0.25]
+        Q3 = quartiles.loc[0.75]
+        IQR = Q3 - Q1
+        lower_bound = Q1 - 3 * IQR
+        upper_bound = Q3 + 3 * IQR
+        
+        in_bounds = numeric_df.ge(lower_bound, axis=1) & numeric_df.le(upper_bound, axis=1)
+        keep_mask = in_bounds.all(axis=1)
+        
+        # Rows failing each column's bounds (a row may fail several columns)
+        self.outlier_counts = {col: int(count) for col, count in (~in_bounds).sum().items() if count > 0}
+        outliers_removed = int((~keep_mask).sum())
         
         if outliers_removed > 0:
-            self.cleaning_report.append(f"✓ Removed {outliers_removed} outlier records")
+            self.df = self.df[keep_mask]
+            per_column = ", ".join(f"{col}: {count}" for col, count in self.outlier_counts.items())
+            self.cleaning_report.append(f"✓ Removed {outliers_removed} outlier records ({per_column})")
         else:
             self.cleaning_report.append("✓ No significant outliers detected")
     
+    def _optimize_memory(self, max_category_ratio=0.5):
+        """Downcast numeric columns and store low-cardinality strings as category"""
+        memory_before = self.df.memory_usage(deep=True).sum() / 1024**2
+        
+        # Integers shrink to 32 bits at most, so column arithmetic elsewhere can't overflow
+        int32 = np.iinfo(np.int32)
+        for col in self.df.select_dtypes(include=['int64']).columns:
+            if self.df[col].empty or (self.df[col].min() >= int32.min and self.df[col].max() <= int32.max):
+                self.df[col] = self.df[col].astype(np.int32)
+        
+        # Floats only move to float32 when every value survives the round trip
+        for col in self.df.select_dtypes(include=['float64']).columns:
+            downcast = self.df[col].astype(np.float32)
+            restored = downcast.astype(np.float64)
+            if ((restored == self.df[col]) | (restored.isna() & self.df[col].isna())).all():
+                self.df[col] = downcast
+        
+        # Repeated strings (cities, districts, property types) become categoricals
+        for col in self.df.select_dtypes(include=['object']).columns:
+            if len(self.df) > 0 and self.df[col].nunique() / len(self.df) <= max_category_ratio:
+                self.df[col] = self.df[col].astype('category')
+        
+        memory_after = self.df.memory_usage(deep=True).sum() / 1024**2
+        self.memory_report = {'before_mb': memory_before, 'after_mb': memory_after}
+        self.cleaning_report.append(f"✓ Optimized memory: {memory_before:.2f} MB → {memory_after:.2f} MB")
+    
     def get_summary_stats(self):
         """Generate summary statistics"""
         stats = {
             'total_records': len(self.df),
             'total_columns': len(self.df.columns),
             'numeric_columns': len(self.df.select_dtypes(include=[np.number]).columns),
-            'categorical_columns': len(self.df.select_dtypes(include=['object']).columns),
+            'categorical_columns': len(self.df.select_dtypes(include=['object', 'category']).columns),
             'memory_usage_mb': self.df.memory_usage(deep=True).sum() / 1024**2
         }
+        if self.memory_report:
+            stats['memory_usage_before_mb'] = self.memory_report['before_mb']
         return stats
 
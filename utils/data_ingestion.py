@@ -0,0 +1,123 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import numpy as np
+import pandas as pd
+from utils.data_cleaner import DataCleaner
+from utils.md5_manager import DataFrameHasher
+
+
+# Rows per batch; bounds peak memory regardless of file size
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Leading rows read to declare column dtypes for the whole file
+DTYPE_SAMPLE_ROWS = 10_000
+
+
+def declare_csv_dtypes(source, sample_rows=DTYPE_SAMPLE_ROWS):
+    """
+    Column dtypes for a whole CSV, declared from its leading rows
+    
+    Numeric columns are declared float64 and text columns object; columns
+    that are empty or boolean in the sample are left to per-chunk
+    inference. File objects are rewound to where they started; returns
+    None when the source cannot be rewound.
+    """
+    if not isinstance(source, str) and not (hasattr(source, 'seek') and hasattr(source, 'tell')):
+        return None
+    
+    position = None if isinstance(source, str) else source.tell()
+    sample = pd.read_csv(source, nrows=sample_rows)
+    if position is not None:
+        source.seek(position)
+    
+    dtypes = {}
+    for col, dtype in sample.dtypes.items():
+        if sample[col].isna().all() or pd.api.types.is_bool_dtype(dtype):
+            continue
+        dtypes[col] = 'float64' if pd.api.types.is_numeric_dtype(dtype) else 'object'
+    return dtypes
+
+
+def ingest_csv(source, db_manager, table_name='uploaded_properties',
+               chunk_rows=DEFAULT_CHUNK_ROWS, dtype=None):
+    """
+    Clean a CSV chunk by chunk and append each chunk to the store
+    
+    Only one chunk is held in memory at a time. Chunks go to a staging
+    table that replaces table_name only once every chunk is written, so a
+    failure leaves the previous dataset untouched. dtype pins column types
+    across chunks; by default it is declared from the leading rows.
+    Columns declared float64 are read as text and converted per chunk, so
+    stray entries such as '-' further down become missing values instead
+    of failing the upload.
+    
+    Rows repeating a row of an earlier chunk are dropped, as whole-file
+    cleaning would. Missing-value fills and outlier bounds are computed per
+    chunk, from that chunk's rows. The result's md5_hash is the fingerprint
+    of the cleaned rows, as for any other stored dataset.
+    """
+    staging_table = f"{table_name}__staging"
+    hasher = DataFrameHasher()
+    seen_rows = set()
+    rows_read = 0
+    rows_saved = 0
+    repeated_rows = 0
+    chunks = 0
+    
+    try:
+        if dtype is None:
+            dtype = declare_csv_dtypes(source)
+        numeric_columns = [col for col, col_dtype in (dtype or {}).items() if col_dtype == 'float64']
+        read_dtype = {col: 'object' if col in numeric_columns else col_dtype for col, col_dtype in (dtype or {}).items()}
+        
+        for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype=read_dtype or None):
+            rows_read += len(chunk)
+            for col in numeric_columns:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+            
+            # Drop rows already seen in earlier chunks; repeats within a chunk are left to the cleaner
+            row_hashes = pd.util.hash_pandas_object(chunk, index=False).tolist()
+            is_new = np.fromiter((h not in seen_rows for h in row_hashes), dtype=bool, count=len(row_hashes))
+            seen_rows.update(row_hashes)
+            repeated_rows += int((~is_new).sum())
+            if not is_new.all():
+                chunk = chunk[is_new]
+            
+            cleaner = DataCleaner(chunk, copy=False)
+            cleaned_chunk, _ = cleaner.clean_data()
+            
+            if_exists = 'replace' if chunks == 0 else 'append'
+            success, msg = db_manager.save_uploaded_data(cleaned_chunk, staging_table, if_exists=if_exists)
+            if not success:
+                db_manager.drop_table(staging_table)
+                return False, msg
+            
+            hasher.update(cleaned_chunk)
+            rows_saved += len(cleaned_chunk)
+            chunks += 1
+        
+        if chunks == 0:
+            return False, "CSV contains no rows"
+        
+        success, msg = db_manager.replace_table(staging_table, table_name)
+        if not success:
+            db_manager.drop_table(staging_table)
+            return False, msg
+    except Exception as e:
+        db_manager.drop_table(staging_table)
+        return False, f"Error ingesting CSV: {str(e)}"
+    
+    return True, {
+        'rows_read': rows_read,
+        'rows_saved': rows_saved,
+        'chunks': chunks,
+        'md5_hash': hasher.hexdigest(),
+        'dtypes': dtype,
+        'cleaning_report': [
+            f"✓ Ingested {rows_saved} of {rows_read} rows in {chunks} chunks of up to {chunk_rows} rows",
+            f"✓ Removed {repeated_rows} rows repeated from earlier chunks"
+        ]
+    }
@@ -2,33 +2,223 @@
 # ORACLE SAMUEL – The Real Estate Market Prophet
 # MD5-Protected AI System. Unauthorized use prohibited.
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
+from utils.dataset_store import DatasetStore
+from utils.md5_manager import verify_data_blocks, verify_data_integrity
 import pandas as pd
+import json
 import os
 
 
 class DatabaseManager:
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_path = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
+        self.engine = get_engine(db_name)
+        # Parquet snapshots of uploaded tables live next to the database file
+        self.dataset_store = DatasetStore(f'{os.path.splitext(os.path.abspath(db_name))[0]}_parquet')
+        run_schema_once(self.engine, 'table_versions', self._initialize_version_table)
     
-    def save_uploaded_data(self, df, table_name='uploaded_properties'):
-        """Save uploaded DataFrame to SQL database"""
+    def _initialize_version_table(self):
+        """Create the per-table write counter"""
         try:
-            df.to_sql(table_name, self.engine, if_exists='replace', index=False)
+            with self.engine.begin() as conn:
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS table_versions (
+                        table_name TEXT PRIMARY KEY,
+                        version INTEGER NOT NULL
+                    )
+                '''))
+        except Exception as e:
+            print(f"Error initializing table versions: {str(e)}")
+            return False
+    
+    def _bump_version(self, conn, table_name):
+        """Record a write to table_name in the writing transaction; returns the new version"""
+        conn.execute(text('''
+            INSERT INTO table_versions (table_name, version) VALUES (:table_name, 1)
+            ON CONFLICT(table_name) DO UPDATE SET version = version + 1
+        '''), {'table_name': table_name})
+        return conn.execute(
+            text('SELECT version FROM table_versions WHERE table_name = :table_name'),
+            {'table_name': table_name}
+        ).scalar()
+    
+    def table_version(self, table_name='uploaded_properties'):
+        """Counter bumped on every write to table_name; shared by all processes using the database"""
+        try:
+            with self.engine.connect() as conn:
+                version = conn.execute(
+                    text('SELECT version FROM table_versions WHERE table_name = :table_name'),
+                    {'table_name': table_name}
+                ).scalar()
+            return version or 0
+        except Exception as e:
+            return None
+    
+    def save_uploaded_data(self, df, table_name='uploaded_properties', if_exists='replace', md5_hash=None):
+        """Save uploaded DataFrame to SQL database (and snapshot it when md5_hash is known)"""
+        try:
+            with self.engine.begin() as conn:
+                df.to_sql(table_name, conn, if_exists=if_exists, index=False)
+                version = self._bump_version(conn, table_name)
+            if md5_hash is not None and if_exists == 'replace':
+                self.dataset_store.save(df, md5_hash, name=table_name, table_version=version)
             return True, f"Data saved successfully to {table_name}"
         except Exception as e:
             return False, f"Error saving data: {str(e)}"
     
-    def get_saved_data(self, table_name='uploaded_properties'):
-        """Retrieve data from SQL database"""
+    def replace_table(self, source_table, table_name='uploaded_properties'):
+        """Swap a fully written staging table in as table_name in one transaction"""
         try:
-            query = f'SELECT * FROM {table_name}'
-            df = pd.read_sql(query, self.engine)
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+                conn.execute(text(f'ALTER TABLE "{source_table}" RENAME TO "{table_name}"'))
+                self._bump_version(conn, table_name)
+            return True, f"Replaced {table_name} with {source_table}"
+        except Exception as e:
+            return False, f"Error replacing table: {str(e)}"
+    
+    def drop_table(self, table_name):
+        """Drop a table if it exists"""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+            return True
+        except Exception as e:
+            return False
+    
+    def append_rows(self, df, table_name='uploaded_properties'):
+        """Insert rows into an existing table without rewriting it"""
+        try:
+            if df.empty:
+                return True, f"No rows to append to {table_name}"
+            if not self.table_exists(table_name):
+                return self.save_uploaded_data(df, table_name)
+            
+            with self.engine.begin() as conn:
+                self._add_missing_columns(conn, df, table_name)
+                conn.execute(self._insert_statement(df, table_name), self._to_records(df))
+                self._bump_version(conn, table_name)
+            return True, f"Appended {len(df)} rows to {table_name}"
+        except Exception as e:
+            return False, f"Error appending data: {str(e)}"
+    
+    def upsert_rows(self, df, key_column='client_id', table_name='uploaded_properties'):
+        """Insert rows, replacing existing rows with the same key, in one transaction"""
+        if key_column not in df.columns:
+            return self.append_rows(df, table_name)
+        
+        # The last row wins when the batch itself repeats a key
+        df = df.drop_duplicates(subset=[key_column], keep='last')
+        
+        try:
+            if df.empty:
+                return True, f"No rows to upsert into {table_name}"
+            if not self.table_exists(table_name):
+                success, msg = self.save_uploaded_data(df, table_name)
+                if not success:
+                    return success, msg
+                with self.engine.begin() as conn:
+                    self._ensure_key_index(conn, key_column, table_name)
+                return True, f"Upserted {len(df)} rows into {table_name}"
+            
+            with self.engine.begin() as conn:
+                self._add_missing_columns(conn, df, table_name)
+                self._ensure_key_index(conn, key_column, table_name)
+                conn.execute(
+                    text(f'DELETE FROM "{table_name}" WHERE "{key_column}" = :p0'),
+                    self._to_records(df[[key_column]])
+                )
+                conn.execute(self._insert_statement(df, table_name), self._to_records(df))
+                self._bump_version(conn, table_name)
+            return True, f"Upserted {len(df)} rows into {table_name}"
+        except Exception as e:
+            return False, f"Error upserting data: {str(e)}"
+    
+    def _add_missing_columns(self, conn, df, table_name):
+        """ALTER TABLE for columns present in df but not yet in the table"""
+        existing = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{table_name}")'))}
+        for col, dtype in df.dtypes.items():
+            if str(col) in existing:
+                continue
+            if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+                sql_type = 'INTEGER'
+            elif pd.api.types.is_float_dtype(dtype):
+                sql_type = 'REAL'
+            else:
+                sql_type = 'TEXT'
+            conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {sql_type}'))
+    
+    def _ensure_key_index(self, conn, key_column, table_name):
+        """Index the upsert key so replacing a row does not scan the table"""
+        conn.execute(text(
+            f'CREATE INDEX IF NOT EXISTS "ix_{table_name}_{key_column}" ON "{table_name}" ("{key_column}")'
+        ))
+    
+    def _insert_statement(self, df, table_name):
+        """Parameterized INSERT for executemany over df's columns"""
+        columns = ', '.join(f'"{col}"' for col in df.columns)
+        params = ', '.join(f':p{i}' for i in range(len(df.columns)))
+        return text(f'INSERT INTO "{table_name}" ({columns}) VALUES ({params})')
+    
+    def _to_records(self, df):
+        """Rows as plain Python values (NaN -> NULL) keyed like _insert_statement"""
+        values = df.astype(object).where(df.notna(), None)
+        return [
+            {f'p{i}': value for i, value in enumerate(row)}
+            for row in values.itertuples(index=False, name=None)
+        ]
+    
+    def get_saved_data(self, table_name='uploaded_properties', columns=None, filters=None):
+        """
+        Retrieve data from SQL database
+        
+        Reads go through the Parquet snapshot when it was taken at the
+        table's current version, so columns and filters (pyarrow-style
+        [(column, op, value)] tuples) are pushed down to the file. A full read
+        from SQL refreshes the snapshot.
+        """
+        try:
+            # Read before the rows: a snapshot tagged with it holds at least that version's
+            # data and is only served while no later write has bumped it
+            version = self.table_version(table_name)
+            if version is not None:
+                df = self.dataset_store.read(name=table_name, columns=columns, filters=filters,
+                                             table_version=version)
+                if df is not None:
+                    return df
+            
+            select = ', '.join(f'"{col}"' for col in columns) if columns else '*'
+            where, params = self._where_clause(filters)
+            df = pd.read_sql(text(f'SELECT {select} FROM "{table_name}"{where}'), self.engine, params=params)
+            
+            if version is not None and columns is None and not filters and not df.empty and self.dataset_store.available:
+                self.dataset_store.save(df, name=table_name, table_version=version)
             return df
         except Exception as e:
             return pd.DataFrame()
     
+    def _where_clause(self, filters):
+        """SQL equivalent of pyarrow-style filter tuples (AND-ed together)"""
+        if not filters:
+            return '', {}
+        
+        clauses, params = [], {}
+        for i, (col, op, value) in enumerate(filters):
+            op = '=' if op == '==' else op
+            if op in ('in', 'not in'):
+                names = [f'f{i}_{j}' for j in range(len(value))]
+                params.update(zip(names, value))
+                placeholders = ', '.join(f':{name}' for name in names)
+                clauses.append(f'"{col}" {op.upper()} ({placeholders})')
+            elif op in ('=', '!=', '<', '<=', '>', '>='):
+                params[f'f{i}'] = value
+                clauses.append(f'"{col}" {op} :f{i}')
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return ' WHERE ' + ' AND '.join(clauses), params
+    
     def save_signature(self, signature_record):
         """Save MD5 signature record"""
         try:
@@ -46,6 +236,66 @@ class DatabaseManager:
         except Exception as e:
             return pd.DataFrame()
     
+    def save_merkle_tree(self, md5_hash, tree):
+        """Save the per-block Merkle hashes for a signed dataset"""
+        try:
+            n_blocks = len(tree['leaves'])
+            df = pd.DataFrame({
+                'md5_hash': [md5_hash] * n_blocks,
+                'block_index': range(n_blocks),
+                'block_hash': tree['leaves'],
+                'block_rows': [tree['block_rows']] * n_blocks,
+                'row_count': [tree['row_count']] * n_blocks,
+                'columns': [json.dumps(tree['columns'])] * n_blocks,
+                'merkle_root': [tree['root']] * n_blocks
+            })
+            
+            with self.engine.begin() as conn:
+                if self.table_exists('md5_merkle_blocks'):
+                    conn.execute(
+                        text('DELETE FROM md5_merkle_blocks WHERE md5_hash = :md5_hash'),
+                        {'md5_hash': md5_hash}
+                    )
+                df.to_sql('md5_merkle_blocks', conn, if_exists='append', index=False)
+            return True
+        except Exception as e:
+            return False
+    
+    def get_merkle_tree(self, md5_hash):
+        """Rebuild the Merkle tree saved for a dataset, or None"""
+        try:
+            df = pd.read_sql(
+                text('SELECT * FROM md5_merkle_blocks WHERE md5_hash = :md5_hash ORDER BY block_index'),
+                self.engine,
+                params={'md5_hash': md5_hash}
+            )
+            if df.empty:
+                return None
+            
+            return {
+                'block_rows': int(df['block_rows'].iloc[0]),
+                'row_count': int(df['row_count'].iloc[0]),
+                'columns': json.loads(df['columns'].iloc[0]),
+                'leaves': df['block_hash'].tolist(),
+                'root': df['merkle_root'].iloc[0],
+                # Trees are stored under the dataset fingerprint they were built with
+                'fingerprint': md5_hash
+            }
+        except Exception as e:
+            return None
+    
+    def verify_dataset(self, df, md5_hash):
+        """
+        Check df against a signed fingerprint: (is_valid, changed_block_indices)
+        
+        Uses the stored Merkle tree when there is one, so a mismatch also
+        says which blocks changed; legacy signatures give an empty list.
+        """
+        tree = self.get_merkle_tree(md5_hash)
+        if tree is not None:
+            return verify_data_blocks(df, tree)
+        return verify_data_integrity(df, md5_hash), []
+    
     def save_model_metrics(self, metrics_dict):
         """Save ML model performance metrics"""
         try:
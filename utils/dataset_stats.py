@@ -0,0 +1,283 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.md5_manager import hash_dataframe
+
+
+# Snapshots kept in the process-wide cache
+MAX_CACHED_SNAPSHOTS = 8
+
+PRICE_KEYWORDS = ['price', 'cost', 'value', 'amount']
+
+# Trained models whose in-sample predictions are kept per snapshot
+MAX_CACHED_MODELS = 4
+
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def find_price_column(columns):
+    """First column whose name looks like a price"""
+    for col in columns:
+        if any(keyword in str(col).lower() for keyword in PRICE_KEYWORDS):
+            return col
+    return None
+
+
+def _moments(values):
+    """Per-column count/mean/M2/min/max (NaN-skipping) plus co-moments of complete rows"""
+    mask = ~np.isnan(values)
+    count = mask.sum(axis=0)
+    safe_count = np.maximum(count, 1)
+    mean = np.where(mask, values, 0.0).sum(axis=0) / safe_count
+    m2 = np.where(mask, (values - mean) ** 2, 0.0).sum(axis=0)
+
+    with np.errstate(all='ignore'):
+        col_min = np.where(count > 0, np.nanmin(np.where(mask, values, np.inf), axis=0), np.nan)
+        col_max = np.where(count > 0, np.nanmax(np.where(mask, values, -np.inf), axis=0), np.nan)
+
+    complete = values[mask.all(axis=1)]
+    pair_count = len(complete)
+    pair_mean = complete.mean(axis=0) if pair_count else np.zeros(values.shape[1])
+    centered = complete - pair_mean
+    comoment = centered.T @ centered
+
+    return {
+        'count': count, 'mean': mean, 'm2': m2, 'min': col_min, 'max': col_max,
+        'pair_count': pair_count, 'pair_mean': pair_mean, 'comoment': comoment
+    }
+
+
+def _merge_moments(a, b):
+    """Combine two moment sets with Chan et al.'s parallel update"""
+    count = a['count'] + b['count']
+    safe_count = np.maximum(count, 1)
+    delta = b['mean'] - a['mean']
+    mean = a['mean'] + delta * b['count'] / safe_count
+    m2 = a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / safe_count
+
+    pair_count = a['pair_count'] + b['pair_count']
+    if pair_count:
+        pair_delta = b['pair_mean'] - a['pair_mean']
+        pair_mean = a['pair_mean'] + pair_delta * b['pair_count'] / pair_count
+        comoment = (a['comoment'] + b['comoment']
+                    + np.outer(pair_delta, pair_delta) * a['pair_count'] * b['pair_count'] / pair_count)
+    else:
+        pair_mean, comoment = a['pair_mean'], a['comoment']
+
+    return {
+        'count': count, 'mean': mean, 'm2': m2,
+        'min': np.fmin(a['min'], b['min']), 'max': np.fmax(a['max'], b['max']),
+        'pair_count': pair_count, 'pair_mean': pair_mean, 'comoment': comoment
+    }
+
+
+class DatasetStatistics:
+    """
+    Summary statistics of a dataset, computed once per fingerprint
+    Moments and correlations merge incrementally on append; quantiles and
+    the premium segment are recomputed lazily from the frame when asked for.
+    """
+
+    def __init__(self, df, hasher=None):
+        self.df = df
+        self._hasher = hasher if hasher is not None else hash_dataframe(df)
+        self.fingerprint = self._hasher.hexdigest()
+        self.columns = list(df.columns)
+        self.price_column = find_price_column(df.columns)
+        self.numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        self._index = {col: i for i, col in enumerate(self.numeric_columns)}
+        self._moments = _moments(self._numeric_values(df))
+        self._quantiles = {}
+        self._premium = {}
+        self._predictions = {}
+
+    @property
+    def row_count(self):
+        return len(self.df)
+
+    def _numeric_values(self, df):
+        return df[self.numeric_columns].to_numpy(dtype=float, na_value=np.nan)
+
+    def append(self, new_rows, df=None):
+        """Snapshot of the dataset with new_rows appended (df: the combined frame, if already built)"""
+        if df is None:
+            df = pd.concat([self.df, new_rows], ignore_index=True)
+
+        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        if list(new_rows.columns) != self.columns or numeric_columns != self.numeric_columns:
+            snapshot = DatasetStatistics(df)
+            _remember(snapshot)
+            return snapshot
+
+        hasher = self._hasher.copy()
+        hasher.update(new_rows)
+
+        snapshot = DatasetStatistics.__new__(DatasetStatistics)
+        snapshot.df = df
+        snapshot._hasher = hasher
+        snapshot.fingerprint = hasher.hexdigest()
+        snapshot.columns = self.columns
+        snapshot.price_column = self.price_column
+        snapshot.numeric_columns = self.numeric_columns
+        snapshot._index = self._index
+        snapshot._moments = _merge_moments(self._moments, _moments(self._numeric_values(new_rows)))
+        snapshot._quantiles = {}
+        snapshot._premium = {}
+        snapshot._predictions = {}
+
+        _remember(snapshot)
+        return snapshot
+
+    def _moment(self, name, col):
+        value = self._moments[name][self._index[col]]
+        return float(value) if self._moments['count'][self._index[col]] > 0 else np.nan
+
+    def mean(self, col):
+        return self._moment('mean', col)
+
+    def std(self, col):
+        """Sample standard deviation (ddof=1), like pandas"""
+        n = self._moments['count'][self._index[col]]
+        if n < 2:
+            return np.nan
+        return float(np.sqrt(self._moments['m2'][self._index[col]] / (n - 1)))
+
+    def min(self, col):
+        return self._moment('min', col)
+
+    def max(self, col):
+        return self._moment('max', col)
+
+    def quantile(self, col, q):
+        """Quantile of a column, cached until the next append"""
+        key = (col, q)
+        if key not in self._quantiles:
+            self._quantiles[key] = float(self.df[col].quantile(q))
+        return self._quantiles[key]
+
+    def median(self, col):
+        return self.quantile(col, 0.5)
+
+    def correlations_with(self, col):
+        """Pearson correlation of every numeric column with col (complete rows only)"""
+        comoment = self._moments['comoment']
+        diagonal = np.sqrt(np.diag(comoment))
+        i = self._index[col]
+        with np.errstate(all='ignore'):
+            corr = np.clip(comoment[:, i] / (diagonal * diagonal[i]), -1.0, 1.0)
+        corr[i] = 1.0 if diagonal[i] > 0 else np.nan
+        return pd.Series(corr, index=self.numeric_columns)
+
+    def premium_segment(self, q=0.90, feature_count=3):
+        """Threshold, size and feature averages of the top price segment"""
+        key = (q, feature_count)
+        if key not in self._premium:
+            price_col = self.price_column
+            threshold = self.quantile(price_col, q)
+            premium_props = self.df[self.df[price_col] >= threshold]
+            numeric_cols = premium_props.select_dtypes(include=[np.number]).columns[:feature_count]
+            self._premium[key] = {
+                'threshold': threshold,
+                'count': len(premium_props),
+                'average_price': float(premium_props[price_col].mean()),
+                'feature_means': {
+                    col: float(premium_props[col].mean()) for col in numeric_cols if col != price_col
+                }
+            }
+        return self._premium[key]
+
+    def _model_predictions(self, predictor):
+        """In-sample predictions and value gaps for the predictor's current model"""
+        model = predictor.model
+        entry = self._predictions.get(id(model))
+        if entry is not None and entry['model']() is model:
+            return entry, None
+
+        # Gaps are measured against the column the model learned, not a name guess
+        target = getattr(predictor, 'target_column', None) or self.price_column
+        if target not in self.df.columns:
+            return None, f"Target column '{target}' not in dataset"
+
+        predictions, error = predictor.predict_batch(self.df)
+        if error:
+            return None, error
+
+        actual = self.df[target].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gaps = (predictions - actual) / actual * 100
+
+        # Forget models that were garbage collected or pushed out
+        self._predictions = {
+            key: value for key, value in self._predictions.items() if value['model']() is not None
+        }
+        while len(self._predictions) >= MAX_CACHED_MODELS:
+            self._predictions.pop(next(iter(self._predictions)))
+
+        entry = {'model': weakref.ref(model), 'actual': actual, 'predictions': predictions, 'gaps': gaps,
+                 'rankings': {}}
+        self._predictions[id(model)] = entry
+        return entry, None
+
+    def value_opportunities(self, predictor, min_gap=10.0, top_k=5):
+        """
+        Properties priced furthest below the model's prediction
+        
+        Returns ({'count', 'top'}, error). Predictions are cached per model
+        and the top_k ranking per (min_gap, top_k), so repeat questions
+        are a lookup.
+        """
+        entry, error = self._model_predictions(predictor)
+        if error:
+            return None, error
+
+        key = (min_gap, top_k)
+        if key not in entry['rankings']:
+            gaps = entry['gaps']
+            candidates = np.flatnonzero(gaps > min_gap)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-gaps[candidates], top_k - 1)[:top_k]]
+            order = candidates[np.argsort(-gaps[candidates], kind='stable')]
+
+            entry['rankings'][key] = {
+                'count': int((gaps > min_gap).sum()),
+                'top': pd.DataFrame({
+                    'actual': entry['actual'][order],
+                    'predicted': entry['predictions'][order],
+                    'value_gap': gaps[order]
+                }, index=self.df.index[order])
+            }
+        return entry['rankings'][key], None
+
+
+def _remember(snapshot):
+    """Add a snapshot to the process-wide cache"""
+    with _snapshots_lock:
+        _snapshots[snapshot.fingerprint] = snapshot
+        _snapshots.move_to_end(snapshot.fingerprint)
+        while len(_snapshots) > MAX_CACHED_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+
+
+def get_dataset_statistics(df):
+    """Return the cached snapshot for df's fingerprint, building it on a miss"""
+    hasher = hash_dataframe(df)
+    fingerprint = hasher.hexdigest()
+
+    with _snapshots_lock:
+        snapshot = _snapshots.get(fingerprint)
+        if snapshot is not None:
+            _snapshots.move_to_end(fingerprint)
+            return snapshot
+
+    snapshot = DatasetStatistics(df, hasher)
+    _remember(snapshot)
+    return snapshot
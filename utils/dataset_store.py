@@ -0,0 +1,147 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import json
+import os
+import threading
+from datetime import datetime
+
+from utils.md5_manager import generate_md5_from_dataframe
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# Row groups carry min/max statistics, so filters can skip whole groups
+PARQUET_ROW_GROUP_SIZE = 65_536
+
+# Snapshots kept per dataset name besides the latest one
+MAX_VERSIONS = 5
+
+_manifest_lock = threading.Lock()
+
+
+class DatasetStore:
+    """
+    Versioned Parquet snapshots of uploaded datasets, keyed by dataset MD5
+    A manifest maps each dataset name to its versions and latest snapshot;
+    each version records the source table's write counter, so a snapshot is
+    only served while the table is still at that version.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.manifest_path = os.path.join(root_dir, 'manifest.json')
+
+    @property
+    def available(self):
+        """Whether pyarrow is installed"""
+        return PYARROW_AVAILABLE
+
+    def _snapshot_path(self, md5_hash):
+        return os.path.join(self.root_dir, f'{md5_hash}.parquet')
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def save(self, df, md5_hash=None, name='uploaded_properties', table_version=None):
+        """Write a snapshot (if new) and make it the latest for name at table_version"""
+        if not PYARROW_AVAILABLE:
+            return False, "pyarrow is not installed"
+
+        try:
+            if md5_hash is None:
+                md5_hash = generate_md5_from_dataframe(df)
+            os.makedirs(self.root_dir, exist_ok=True)
+
+            path = self._snapshot_path(md5_hash)
+            if not os.path.exists(path):
+                table = pa.Table.from_pandas(
+                    df.rename(columns=str), preserve_index=False
+                )
+                tmp_path = f'{path}.tmp'
+                pq.write_table(table, tmp_path, row_group_size=PARQUET_ROW_GROUP_SIZE)
+                os.replace(tmp_path, path)
+
+            with _manifest_lock:
+                manifest = self._read_manifest()
+                entry = manifest.setdefault(name, {'latest': None, 'versions': []})
+                entry['versions'] = [v for v in entry['versions'] if v['md5_hash'] != md5_hash]
+                entry['versions'].append({
+                    'md5_hash': md5_hash,
+                    'rows': len(df),
+                    'columns': [str(col) for col in df.columns],
+                    'table_version': table_version,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+                entry['latest'] = md5_hash
+
+                # Drop the oldest snapshots no other dataset still points to
+                pruned = entry['versions'][:-MAX_VERSIONS]
+                entry['versions'] = entry['versions'][-MAX_VERSIONS:]
+                in_use = {v['md5_hash'] for e in manifest.values() for v in e['versions']}
+                for version in pruned:
+                    if version['md5_hash'] not in in_use:
+                        try:
+                            os.remove(self._snapshot_path(version['md5_hash']))
+                        except OSError:
+                            pass
+
+                self._write_manifest(manifest)
+
+            return True, md5_hash
+        except Exception as e:
+            return False, f"Error saving snapshot: {str(e)}"
+
+    def latest(self, name='uploaded_properties', table_version=None):
+        """MD5 of the current snapshot for name, or None if missing or taken at another table_version"""
+        entry = self._read_manifest().get(name)
+        if not entry or not entry['latest']:
+            return None
+        if table_version is not None:
+            version = next((v for v in entry['versions'] if v['md5_hash'] == entry['latest']), {})
+            if version.get('table_version') != table_version:
+                return None
+        if not os.path.exists(self._snapshot_path(entry['latest'])):
+            return None
+        return entry['latest']
+
+    def read(self, md5_hash=None, name='uploaded_properties', columns=None, filters=None,
+             memory_map=True, table_version=None):
+        """
+        Load a snapshot as a DataFrame, or None if there is none
+
+        Without md5_hash the latest snapshot is read, if it was taken at
+        table_version. columns projects the read to the named columns and filters pushes
+        pyarrow predicates such as [('city', '=', 'Haifa')] down to the row
+        groups. memory_map maps the file instead of reading it into memory.
+        """
+        if not PYARROW_AVAILABLE:
+            return None
+
+        if md5_hash is None:
+            md5_hash = self.latest(name, table_version)
+            if md5_hash is None:
+                return None
+
+        path = self._snapshot_path(md5_hash)
+        if not os.path.exists(path):
+            return None
+
+        table = pq.read_table(path, columns=columns, filters=filters, memory_map=memory_map)
+        return table.to_pandas()
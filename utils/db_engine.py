@@ -0,0 +1,66 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import os
+import threading
+
+from sqlalchemy import create_engine, event
+
+
+# Applied to every new SQLite connection: WAL lets readers run alongside a
+# writer, NORMAL sync is durable under WAL, and busy_timeout waits out locks
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000"
+)
+
+_engines = {}
+_initialized_schemas = set()
+_lock = threading.RLock()
+
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    """Configure a freshly opened SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def get_engine(db_name='oracle_samuel_real_estate.db'):
+    """Return the process-wide pooled engine for a SQLite database file"""
+    key = os.path.abspath(db_name)
+
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(
+                f'sqlite:///{key}',
+                connect_args={'check_same_thread': False, 'timeout': 30},
+                pool_size=5,
+                max_overflow=10
+            )
+            event.listen(engine, 'connect', _apply_pragmas)
+            _engines[key] = engine
+        return engine
+
+
+def run_schema_once(engine, schema_name, setup):
+    """
+    Run a manager's DDL the first time it is needed for an engine
+
+    setup is retried on the next call if it returns False.
+    """
+    key = (engine.url.database, schema_name)
+
+    with _lock:
+        if key in _initialized_schemas:
+            return
+        if setup() is not False:
+            _initialized_schemas.add(key)
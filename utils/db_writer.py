@@ -0,0 +1,201 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+# Flush once this many records are queued or the oldest has waited this long
+DEFAULT_MAX_BATCH = 200
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# A table group hitting an operational error (e.g. a locked database) is
+# retried this many times, with growing pauses, before its rows are
+# written one by one
+MAX_RETRIES = 2
+RETRY_DELAY = 0.1
+
+# Rows that could not be written at all; the oldest are discarded first
+DEAD_LETTER_LIMIT = 1000
+
+logger = logging.getLogger(__name__)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _plain(value):
+    """Convert numpy scalars to Python values the DB driver can bind"""
+    return value.item() if hasattr(value, 'item') else value
+
+
+class BufferedWriter:
+    """
+    Background thread that batches log records into bulk INSERT transactions
+    Records are plain dicts; each flush runs one executemany per table and
+    column set. flush() blocks until everything queued so far is committed.
+    A failing table group is retried, then written row by row, so one bad
+    record only costs itself; rows that still fail land in dead_letters.
+    """
+
+    def __init__(self, engine, max_batch=DEFAULT_MAX_BATCH, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._thread = None
+        self._closed = False
+        self.dead_letters = deque(maxlen=DEAD_LETTER_LIMIT)
+
+    def _ensure_thread(self):
+        """Start the writer thread on first use (lock held)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='oracle-db-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, table, record):
+        """Queue one row for table"""
+        self.write_many(table, [record])
+
+    def write_many(self, table, records):
+        """Queue several rows for table; they are committed together"""
+        if not records:
+            return
+        with self._lock:
+            if self._closed:
+                # After shutdown, fall back to a synchronous insert
+                self._insert_batch([(table, record) for record in records])
+                return
+            self._pending += len(records)
+            self._ensure_thread()
+            self._queue.put(('rows', table, records))
+
+    def flush(self, timeout=None):
+        """Block until every record queued so far has been written"""
+        with self._lock:
+            if self._pending == 0 or self._thread is None:
+                return True
+            done = threading.Event()
+            self._queue.put(('flush', done, None))
+        return done.wait(timeout)
+
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(('stop', None, None))
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        """Collect records until the batch is full or the interval elapses, then write"""
+        batch = []
+        waiters = []
+        deadline = None
+        stop = False
+
+        while not stop:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, first, second = self._queue.get(timeout=timeout)
+                if kind == 'rows':
+                    batch.extend((first, record) for record in second)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                elif kind == 'flush':
+                    waiters.append(first)
+                else:
+                    stop = True
+            except queue.Empty:
+                pass
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.max_batch or due or waiters or stop):
+                self._insert_batch(batch)
+                with self._lock:
+                    self._pending -= len(batch)
+                batch = []
+                deadline = None
+
+            for event in waiters:
+                event.set()
+            waiters = []
+
+    def _insert_batch(self, batch):
+        """Write queued rows in one transaction, falling back to per-group and per-row writes"""
+        groups = {}
+        for table, record in batch:
+            groups.setdefault((table, tuple(record)), []).append(record)
+
+        try:
+            with self.engine.begin() as conn:
+                for (table, columns), records in groups.items():
+                    self._execute(conn, table, columns, records)
+            return
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch)} buffered records failed, isolating tables: {str(e)}")
+
+        for (table, columns), records in groups.items():
+            self._insert_group(table, columns, records)
+
+    def _execute(self, conn, table, columns, records):
+        """One executemany INSERT of records sharing a column set"""
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        params = ', '.join(f':p{i}' for i in range(len(columns)))
+        rows = [{f'p{i}': _plain(value) for i, value in enumerate(record.values())} for record in records]
+        conn.execute(text(f'INSERT INTO "{table}" ({column_list}) VALUES ({params})'), rows)
+
+    def _insert_group(self, table, columns, records):
+        """Write one table's rows, retrying operational errors, then row by row"""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with self.engine.begin() as conn:
+                    self._execute(conn, table, columns, records)
+                return
+            except Exception as e:
+                error = e
+                if not isinstance(e, OperationalError) or attempt == MAX_RETRIES:
+                    break
+                time.sleep(RETRY_DELAY * (attempt + 1))
+
+        logger.warning(f"{len(records)} records for {table} failed, writing row by row: {str(error)}")
+        for record in records:
+            try:
+                with self.engine.begin() as conn:
+                    self._execute(conn, table, columns, [record])
+            except Exception as e:
+                self.dead_letters.append((table, record, str(e)))
+                logger.error(f"Dropped buffered record for {table}: {str(e)}")
+
+
+def get_writer(engine):
+    """Return the shared buffered writer for an engine"""
+    with _writers_lock:
+        writer = _writers.get(id(engine))
+        if writer is None:
+            writer = BufferedWriter(engine)
+            _writers[id(engine)] = writer
+        return writer
+
+
+@atexit.register
+def close_all_writers():
+    """Drain every writer at interpreter shutdown"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
@@ -4,7 +4,8 @@
 
 import hashlib
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from utils.db_engine import get_engine, run_schema_once
 import pandas as pd
 from datetime import datetime
 
@@ -17,8 +18,8 @@ class ProjectIntegrityChecker:
     
     def __init__(self, db_name='oracle_samuel_real_estate.db'):
         self.db_name = db_name
-        self.engine = create_engine(f'sqlite:///{db_name}')
-        self._initialize_integrity_table()
+        self.engine = get_engine(db_name)
+        run_schema_once(self.engine, 'project_hashes', self._initialize_integrity_table)
         self.critical_files = [
             'app.py',
             'agent.py',
@@ -47,6 +48,7 @@ class ProjectIntegrityChecker:
                 conn.commit()
         except Exception as e:
             print(f"Error initializing integrity table: {str(e)}")
+            return False
     
     def calculate_file_hash(self, file_path):
         """Calculate MD5 hash of a file"""
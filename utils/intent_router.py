@@ -0,0 +1,52 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import re
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(query):
+    """Lowercase alphanumeric tokens of a query"""
+    return _TOKEN_PATTERN.findall(query.lower())
+
+
+class IntentRouter:
+    """
+    Keyword intent router compiled into a hash index
+    Each query is tokenized once; every token prefix is looked up in a
+    keyword -> intents table, so 'features' or 'predictions' still match
+    'feature' and 'predict'. Routes are scored by matched keywords, ties
+    going to the intent declared first.
+    """
+
+    def __init__(self, routes, default_intent=None):
+        self.default_intent = default_intent
+        self._priority = {}
+        self._index = {}
+
+        for priority, (intent, keywords) in enumerate(routes):
+            self._priority[intent] = priority
+            for keyword in keywords:
+                self._index.setdefault(keyword.lower(), []).append(intent)
+
+        self._min_length = min((len(k) for k in self._index), default=1)
+        self._max_length = max((len(k) for k in self._index), default=0)
+
+    def route(self, query):
+        """Scored routes for a query, best first: [(intent, score), ...]"""
+        scores = {}
+        for token in tokenize(query):
+            # Each token counts once per intent, even if several prefixes match
+            matched = set()
+            for length in range(self._min_length, min(len(token), self._max_length) + 1):
+                matched.update(self._index.get(token[:length], ()))
+            for intent in matched:
+                scores[intent] = scores.get(intent, 0) + 1
+
+        if not scores:
+            return [(self.default_intent, 0)] if self.default_intent is not None else []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], self._priority[item[0]]))
@@ -3,10 +3,18 @@
 # MD5-Protected AI System. Unauthorized use prohibited.
 
 import hashlib
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
 
+# Rows hashed per block; bounds the extra memory used while fingerprinting
+FINGERPRINT_BLOCK_ROWS = 100_000
+
+# Rows per Merkle leaf; an appended row only rehashes the last leaf
+MERKLE_BLOCK_ROWS = 1024
+
+
 def generate_md5_signature(file_path):
     """Generate MD5 hash for a file"""
     try:
@@ -17,19 +25,246 @@ def generate_md5_signature(file_path):
         return f"Error generating MD5: {str(e)}"
 
 
-def generate_md5_from_dataframe(df):
-    """Generate MD5 hash from DataFrame content"""
+def _row_hashes(block):
+    """Stable per-row uint64 hashes of a block, independent of storage dtypes"""
+    # Numbers hash by their float64 value, so int32/int64/float32/float64 storage
+    # (and 5 vs 5.0 or True vs 1 after a concat or SQL round trip) fingerprint the same
+    widened = {
+        col: 'float64' for col, dtype in block.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype)
+    }
+    if widened:
+        block = block.astype(widened)
+    
+    # Categoricals hash identically to their object values
+    hashes = pd.util.hash_pandas_object(block, index=False)
+    return hashes.to_numpy(dtype=np.uint64).astype('<u8', copy=False)
+
+
+class DataFrameHasher:
+    """
+    Incremental MD5 fingerprint over successive row blocks of a DataFrame
+    
+    The digest covers the column names joined by NUL bytes, followed by the
+    little-endian uint64 per-row hashes of pandas.util.hash_pandas_object
+    (index excluded, numeric columns as float64). Rows are hashed
+    independently, so the result does not depend on how the frame is split
+    into blocks or chunks.
+    """
+    
+    def __init__(self):
+        self._md5 = hashlib.md5()
+        self._columns = None
+    
+    def update(self, block):
+        """Feed the next block of rows"""
+        self.update_hashes(block.columns, _row_hashes(block) if len(block) > 0 else None)
+    
+    def update_hashes(self, columns, row_hashes):
+        """Feed per-row hashes already computed with _row_hashes"""
+        columns = [str(col) for col in columns]
+        if self._columns is None:
+            self._columns = columns
+            self._md5.update("\x00".join(columns).encode())
+        elif columns != self._columns:
+            raise ValueError("All blocks must share the same columns")
+        
+        if row_hashes is not None and len(row_hashes) > 0:
+            self._md5.update(row_hashes.tobytes())
+    
+    def hexdigest(self):
+        """Fingerprint of every row fed so far"""
+        return self._md5.hexdigest()
+    
+    def copy(self):
+        """Independent hasher that can be resumed with further rows"""
+        clone = DataFrameHasher()
+        clone._md5 = self._md5.copy()
+        clone._columns = self._columns
+        return clone
+
+
+def hash_dataframe(df, block_rows=FINGERPRINT_BLOCK_ROWS):
+    """Feed a whole DataFrame through a new DataFrameHasher and return it"""
+    hasher = DataFrameHasher()
+    for start in range(0, max(len(df), 1), block_rows):
+        hasher.update(df.iloc[start:start + block_rows])
+    return hasher
+
+
+def generate_md5_from_dataframe(df, method='blocks', block_rows=FINGERPRINT_BLOCK_ROWS):
+    """
+    Generate MD5 hash from DataFrame content
+    
+    method='blocks' streams the frame through DataFrameHasher block_rows
+    rows at a time, using constant extra memory. method='json' reproduces
+    the legacy hash over df.to_json(orient='records').
+    """
     try:
-        data_string = df.to_json(orient='records')
-        return hashlib.md5(data_string.encode()).hexdigest()
+        if method == 'json':
+            data_string = df.to_json(orient='records')
+            return hashlib.md5(data_string.encode()).hexdigest()
+        
+        return hash_dataframe(df, block_rows).hexdigest()
     except Exception as e:
         return f"Error generating MD5: {str(e)}"
 
 
-def verify_data_integrity(df, stored_hash):
-    """Verify if DataFrame matches stored MD5 hash"""
-    current_hash = generate_md5_from_dataframe(df)
-    return current_hash == stored_hash
+def _block_digest(block):
+    """MD5 of one Merkle leaf (a block of rows)"""
+    return hashlib.md5(_row_hashes(block).tobytes()).hexdigest()
+
+
+def _merkle_root(leaves):
+    """Fold leaf hashes pairwise up to the root (odd nodes are paired with themselves)"""
+    level = [bytes.fromhex(leaf) for leaf in leaves] or [hashlib.md5(b"").digest()]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.md5(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def fingerprint_dataframe(df, hasher=None, tree=None, block_rows=MERKLE_BLOCK_ROWS):
+    """
+    Fingerprint hasher and Merkle tree of a DataFrame from one hashing pass
+    
+    Each block's row hashes feed both the fingerprint and its leaf. Given
+    the hasher and tree of an earlier state that rows were only appended
+    to, both are resumed: only the last partial leaf and the new rows are
+    hashed. Returns (hasher, tree); tree['fingerprint'] is the dataset MD5.
+    """
+    columns = [str(col) for col in df.columns]
+    resumable = (
+        hasher is not None and tree is not None
+        and tree['columns'] == columns and tree['row_count'] <= len(df)
+        and tree.get('fingerprint') == hasher.hexdigest()
+    )
+    
+    if resumable:
+        block_rows = tree['block_rows']
+        start_row = tree['row_count']
+        first_block = start_row // block_rows
+        hasher = hasher.copy()
+        leaves = tree['leaves'][:first_block]
+    else:
+        start_row = 0
+        first_block = 0
+        hasher = DataFrameHasher()
+        leaves = []
+    hasher.update_hashes(columns, None)
+    
+    for start in range(first_block * block_rows, len(df), block_rows):
+        row_hashes = _row_hashes(df.iloc[start:start + block_rows])
+        leaves.append(hashlib.md5(row_hashes.tobytes()).hexdigest())
+        # Rows before start_row are already part of the resumed fingerprint
+        hasher.update_hashes(columns, row_hashes[max(start_row - start, 0):])
+    
+    return hasher, {
+        'block_rows': block_rows,
+        'row_count': len(df),
+        'columns': columns,
+        'leaves': leaves,
+        'root': _merkle_root(leaves),
+        'fingerprint': hasher.hexdigest()
+    }
+
+
+def build_merkle_tree(df, block_rows=MERKLE_BLOCK_ROWS):
+    """Hash a DataFrame into per-row-block leaves plus a Merkle root"""
+    return fingerprint_dataframe(df, block_rows=block_rows)[1]
+
+
+def find_changed_blocks(df, tree, blocks=None):
+    """Re-hash only the given blocks (default: all) and return the indices that differ"""
+    block_rows = tree['block_rows']
+    n_blocks = max(len(tree['leaves']), -(-len(df) // block_rows))
+    
+    if [str(col) for col in df.columns] != tree['columns']:
+        return list(range(n_blocks))
+    
+    if blocks is None:
+        blocks = range(n_blocks)
+    
+    changed = []
+    for index in blocks:
+        block = df.iloc[index * block_rows:(index + 1) * block_rows]
+        stored = tree['leaves'][index] if index < len(tree['leaves']) else None
+        current = _block_digest(block) if len(block) > 0 else None
+        if current != stored:
+            changed.append(index)
+    return changed
+
+
+def find_modified_blocks(old_tree, df, tree=None):
+    """
+    Blocks of the rows old_tree covered that differ in df
+    
+    With df's own tree, whole blocks are compared by leaf and only a
+    trailing partial block of the old rows is rehashed. Appended rows are
+    not reported; removed rows show up as changed blocks.
+    """
+    block_rows = old_tree['block_rows']
+    old_count = old_tree['row_count']
+    n_old_blocks = len(old_tree['leaves'])
+    
+    if [str(col) for col in df.columns] != old_tree['columns']:
+        return list(range(n_old_blocks))
+    
+    if tree is None or tree['block_rows'] != block_rows:
+        return find_changed_blocks(df.iloc[:old_count], old_tree)
+    
+    full_blocks = old_count // block_rows
+    changed = [
+        index for index in range(full_blocks)
+        if index >= len(tree['leaves']) or (index + 1) * block_rows > len(df)
+        or tree['leaves'][index] != old_tree['leaves'][index]
+    ]
+    if full_blocks < n_old_blocks:
+        # The old last block was partial; compare just its rows
+        if len(df) < old_count:
+            changed.append(full_blocks)
+        else:
+            changed.extend(full_blocks + i for i in find_changed_blocks(
+                df.iloc[full_blocks * block_rows:old_count],
+                {**old_tree, 'leaves': old_tree['leaves'][full_blocks:]}
+            ))
+    return changed
+
+
+def modified_row_count(old_tree, df, tree=None):
+    """Rows changed, removed or appended since old_tree, counted at block granularity"""
+    block_rows = old_tree['block_rows']
+    old_count = old_tree['row_count']
+    changed_rows = sum(
+        min(block_rows, old_count - index * block_rows)
+        for index in find_modified_blocks(old_tree, df, tree)
+    )
+    return changed_rows + max(len(df) - old_count, 0)
+
+
+def verify_data_blocks(df, tree):
+    """Check a DataFrame against its stored Merkle tree: (is_valid, changed_block_indices)"""
+    changed = find_changed_blocks(df, tree)
+    return not changed, changed
+
+
+def verify_data_integrity(df, stored_hash, tree=None):
+    """
+    Verify if DataFrame matches stored MD5 hash
+    
+    With the Merkle tree stored for stored_hash the blocks decide in one
+    pass (see verify_data_blocks for which ones changed); the legacy JSON
+    hash is only tried for signatures that have no tree.
+    """
+    if tree is not None:
+        return verify_data_blocks(df, tree)[0]
+    
+    if generate_md5_from_dataframe(df) == stored_hash:
+        return True
+    
+    # Signatures recorded before block fingerprints used the JSON form
+    return generate_md5_from_dataframe(df, method='json') == stored_hash
 
 
 def create_signature_record(file_name, md5_hash):
@@ -0,0 +1,118 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime
+
+import joblib
+
+from self_learning.trainer import SelfLearningTrainer
+from utils.similarity_index import SimilarityIndex, similarity_index_path
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of the trained model artifact
+    Loads the joblib file once and hot-swaps it when a new MD5 appears;
+    the similar-properties index stored next to it is reloaded the same way
+    """
+
+    def __init__(self, model_path='oracle_samuel_model.pkl'):
+        self.model_path = model_path
+        self._lock = threading.Lock()
+        self._current = (None, None)
+        self._file_stat = None
+        self._info = None
+        self.index_path = similarity_index_path(model_path)
+        self._index = None
+        self._index_stat = None
+
+    def _current_stat(self, path=None):
+        """Cheap change detector for the artifact file"""
+        try:
+            stat = os.stat(path or self.model_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self, file_stat):
+        """Load the artifact and swap it in if its MD5 changed (lock held)"""
+        with open(self.model_path, 'rb') as f:
+            raw = f.read()
+
+        md5_hash = hashlib.md5(raw).hexdigest()
+        self._file_stat = file_stat
+
+        if md5_hash == self._current[1]:
+            return
+
+        model_data = joblib.load(io.BytesIO(raw))
+        predictor = SelfLearningTrainer()
+        predictor.restore_model_data(model_data)
+
+        loaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        info = {
+            'model_name': predictor.best_model_name,
+            'md5_hash': md5_hash,
+            'model_path': self.model_path,
+            'metrics': dict(predictor.best_metrics),
+            'trained_at': model_data.get('timestamp') or loaded_at,
+            'loaded_at': loaded_at
+        }
+
+        # Single reference assignments - readers see either the old or the new model
+        self._current = (predictor, md5_hash)
+        self._info = info
+
+    def get_predictor(self):
+        """Return (predictor, md5_hash) for the current artifact, reloading only if it changed"""
+        file_stat = self._current_stat()
+
+        if file_stat is not None and file_stat != self._file_stat:
+            with self._lock:
+                # Another request may have reloaded while we waited
+                if file_stat != self._file_stat:
+                    try:
+                        self._load(file_stat)
+                    except Exception as e:
+                        # Keep serving the previous model if the new artifact is unreadable
+                        print(f"Error loading model artifact: {str(e)}")
+
+        return self._current
+
+    def get_similarity_index(self):
+        """Return the similar-properties index, reloading only if its file changed"""
+        file_stat = self._current_stat(self.index_path)
+
+        if file_stat != self._index_stat:
+            with self._lock:
+                if file_stat != self._index_stat:
+                    try:
+                        self._index = SimilarityIndex.load(self.index_path) if file_stat is not None else None
+                    except Exception as e:
+                        print(f"Error loading similarity index: {str(e)}")
+                    self._index_stat = file_stat
+
+        return self._index
+
+    def get_model_info(self):
+        """Describe the current model (loading it if needed), or None without one"""
+        self.get_predictor()
+        info = self._info
+        return dict(info) if info is not None else None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_model_registry(model_path='oracle_samuel_model.pkl'):
+    """Return the shared registry for a model path"""
+    with _registries_lock:
+        if model_path not in _registries:
+            _registries[model_path] = ModelRegistry(model_path)
+        return _registries[model_path]
@@ -0,0 +1,94 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import hashlib
+import json
+import time
+
+from prometheus_client import Counter
+
+
+DEFAULT_TTL_SECONDS = 3600
+
+# Seconds to skip Redis after it fails
+REDIS_RETRY_SECONDS = 30
+
+# Decimal places kept for float fields, so 120 and 120.0000001 share an entry
+FLOAT_PRECISION = 6
+
+CACHE_REQUESTS = Counter(
+    'oracle_prediction_cache_requests_total',
+    'Prediction cache lookups by result',
+    ['result']
+)
+CACHE_ERRORS = Counter(
+    'oracle_prediction_cache_errors_total',
+    'Prediction cache Redis errors'
+)
+
+
+def canonicalize_request(fields):
+    """Normalized form of request fields: rounded floats; strings stay exact, as the model encodes them"""
+    canonical = {}
+    for name, value in sorted(fields.items()):
+        if isinstance(value, float):
+            value = round(value, FLOAT_PRECISION)
+            if value.is_integer():
+                value = int(value)
+        canonical[name] = value
+    return canonical
+
+
+class PredictionCache:
+    """
+    Redis cache of prediction responses
+    Keys hash the canonicalized request together with the artifact versions
+    (model MD5, similarity index), so a new model simply misses and old
+    entries age out with the TTL. Redis errors count as misses and pause
+    the cache for a while.
+    """
+
+    def __init__(self, redis_client, ttl_seconds=DEFAULT_TTL_SECONDS, key_prefix='prediction'):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._disabled_until = 0.0
+
+    def key(self, fields, versions):
+        """Cache key for request fields under the given artifact versions"""
+        payload = json.dumps([versions, canonicalize_request(fields)], sort_keys=True, default=str)
+        return f"{self.key_prefix}:{hashlib.md5(payload.encode()).hexdigest()}"
+
+    def _available(self):
+        return self.redis_client is not None and time.monotonic() >= self._disabled_until
+
+    def _failed(self, e):
+        CACHE_ERRORS.inc()
+        self._disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+        print(f"Prediction cache unavailable: {str(e)}")
+
+    def get(self, key):
+        """Cached response dict, or None on a miss"""
+        if not self._available():
+            CACHE_REQUESTS.labels(result='miss').inc()
+            return None
+
+        try:
+            cached = self.redis_client.get(key)
+        except Exception as e:
+            self._failed(e)
+            cached = None
+
+        CACHE_REQUESTS.labels(result='hit' if cached is not None else 'miss').inc()
+        return json.loads(cached) if cached is not None else None
+
+    def set(self, key, response):
+        """Store a response dict under key with the TTL"""
+        if not self._available():
+            return
+
+        try:
+            self.redis_client.setex(key, self.ttl_seconds, json.dumps(response, default=str))
+        except Exception as e:
+            self._failed(e)
@@ -11,6 +11,7 @@ from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 from sklearn.preprocessing import LabelEncoder
 from datetime import datetime
 import pickle
+from utils.category_encoder import build_category_maps, encode_categoricals
 
 
 class RealEstatePredictor:
@@ -20,6 +21,7 @@ class RealEstatePredictor:
         self.feature_importance = None
         self.metrics = {}
         self.label_encoders = {}
+        self.category_maps = {}
         self.feature_columns = []
         self.target_column = None
     
@@ -43,12 +45,14 @@ class RealEstatePredictor:
         y = self.df[target_col]
         
         # Handle categorical variables
-        categorical_cols = X.select_dtypes(include=['object']).columns
+        categorical_cols = X.select_dtypes(include=['object', 'category']).columns
         for col in categorical_cols:
             le = LabelEncoder()
             X[col] = le.fit_transform(X[col].astype(str))
             self.label_encoders[col] = le
         
+        self.category_maps = build_category_maps(self.label_encoders)
+        
         # Store feature columns
         self.feature_columns = X.columns.tolist()
         
@@ -108,17 +112,22 @@ class RealEstatePredictor:
     
     def predict_price(self, input_data):
         """Predict price for new data"""
+        predictions, error = self.predict_batch(pd.DataFrame([input_data]))
+        if error:
+            return None, error
+        
+        return round(predictions[0], 2), None
+    
+    def predict_batch(self, df):
+        """Predict prices for every row of a DataFrame in one model call"""
         if self.model is None:
             return None, "Model not trained yet"
         
         try:
-            # Prepare input
-            X = pd.DataFrame([input_data])
+            X = df.copy()
             
-            # Apply label encoding
-            for col, le in self.label_encoders.items():
-                if col in X.columns:
-                    X[col] = le.transform(X[col].astype(str))
+            # Apply label encoding via lookup tables (unseen values get their own code)
+            encode_categoricals(X, self.category_maps)
             
             # Ensure all feature columns exist
             for col in self.feature_columns:
@@ -127,8 +136,8 @@ class RealEstatePredictor:
             
             X = X[self.feature_columns]
             
-            prediction = self.model.predict(X)[0]
-            return round(prediction, 2), None
+            predictions = self.model.predict(X)
+            return np.round(predictions, 2), None
         except Exception as e:
             return None, f"Prediction error: {str(e)}"
     
@@ -0,0 +1,200 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from utils.intent_router import tokenize
+
+
+# Per-worker bounds: sessions kept, answers memoized and turns remembered per session
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_MAX_ANSWERS = 64
+DEFAULT_MAX_HISTORY = 50
+DEFAULT_TTL_SECONDS = 1800
+
+# Seconds to skip the Redis tier after it fails
+REDIS_RETRY_SECONDS = 30
+
+
+class ChatSession:
+    """One conversation: bound agent, memoized answers and recent turns"""
+
+    def __init__(self, agent, agent_key):
+        self.agent = agent
+        self.agent_key = agent_key
+        self.answers = OrderedDict()
+        self.history = []
+        self.last_access = time.monotonic()
+
+
+class ChatSessionStore:
+    """
+    LRU + TTL store of chat sessions keyed by session_id
+    Sessions live in process; answers and history are also written to an
+    optional Redis tier so other workers can reuse them. Redis failures only
+    disable that tier for a while.
+    """
+
+    def __init__(self, redis_client=None, max_sessions=DEFAULT_MAX_SESSIONS,
+                 max_answers=DEFAULT_MAX_ANSWERS, max_history=DEFAULT_MAX_HISTORY,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, key_prefix='chat'):
+        self.redis_client = redis_client
+        self.max_sessions = max_sessions
+        self.max_answers = max_answers
+        self.max_history = max_history
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis_disabled_until = 0.0
+
+    def _redis(self):
+        if self.redis_client is None or time.monotonic() < self._redis_disabled_until:
+            return None
+        return self.redis_client
+
+    def _redis_failed(self):
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _answer_key(self, session_id, agent_key, normalized):
+        digest = hashlib.md5(json.dumps([agent_key, normalized], default=str).encode()).hexdigest()
+        return f"{self.key_prefix}:{session_id}:answer:{digest}"
+
+    def _history_key(self, session_id):
+        return f"{self.key_prefix}:{session_id}:history"
+
+    def _answers_key(self, session_id):
+        """Set of the session's answer keys, so clear() can find them"""
+        return f"{self.key_prefix}:{session_id}:answers"
+
+    def _evict_expired(self, now):
+        """Drop sessions idle longer than the TTL (lock held)"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+
+    def get_session(self, session_id, agent, agent_key):
+        """Return the session bound to the current agent, creating or rebinding it"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ChatSession(agent, agent_key)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            elif session.agent_key != agent_key:
+                # New data or model: earlier answers no longer apply
+                session.agent = agent
+                session.agent_key = agent_key
+                session.answers.clear()
+
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def reply(self, session_id, message, agent, agent_key):
+        """Answer a message, reusing memoized answers for repeated questions"""
+        session = self.get_session(session_id, agent, agent_key)
+        # Questions differing only in case or punctuation share one answer
+        normalized = " ".join(tokenize(message))
+
+        response = session.answers.get(normalized)
+        cached = response is not None
+
+        redis = self._redis()
+        if response is None and redis is not None:
+            try:
+                stored = redis.get(self._answer_key(session_id, agent_key, normalized))
+                if stored is not None:
+                    response = stored.decode() if isinstance(stored, bytes) else stored
+                    cached = True
+            except Exception:
+                self._redis_failed()
+
+        routes = agent.route_query(message)
+        if response is None:
+            response = agent.analyze_query(message, routes=routes)
+            redis = self._redis()
+            if redis is not None:
+                try:
+                    answer_key = self._answer_key(session_id, agent_key, normalized)
+                    answers_key = self._answers_key(session_id)
+                    pipe = redis.pipeline()
+                    pipe.setex(answer_key, self.ttl_seconds, response)
+                    pipe.sadd(answers_key, answer_key)
+                    pipe.expire(answers_key, self.ttl_seconds)
+                    pipe.execute()
+                except Exception:
+                    self._redis_failed()
+
+        with self._lock:
+            session.answers[normalized] = response
+            session.answers.move_to_end(normalized)
+            while len(session.answers) > self.max_answers:
+                session.answers.popitem(last=False)
+
+            turn = {
+                'message': message,
+                'intents': [intent for intent, _ in routes],
+                'cached': cached,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            session.history.append(turn)
+            del session.history[:-self.max_history]
+
+        self._save_history(session_id, turn)
+        return {'response': response, 'routes': routes, 'cached': cached}
+
+    def _save_history(self, session_id, turn):
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            key = self._history_key(session_id)
+            pipe = redis.pipeline()
+            pipe.rpush(key, json.dumps(turn))
+            pipe.ltrim(key, -self.max_history, -1)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception:
+            self._redis_failed()
+
+    def get_history(self, session_id):
+        """Recent turns of a session (from Redis when this worker has none)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.history:
+                return list(session.history)
+
+        redis = self._redis()
+        if redis is not None:
+            try:
+                return [json.loads(item) for item in redis.lrange(self._history_key(session_id), 0, -1)]
+            except Exception:
+                self._redis_failed()
+        return []
+
+    def clear(self, session_id):
+        """Forget a session in this worker and in Redis"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+        redis = self._redis()
+        if redis is not None:
+            try:
+                answers_key = self._answers_key(session_id)
+                answer_keys = list(redis.smembers(answers_key))
+                redis.delete(self._history_key(session_id), answers_key, *answer_keys)
+            except Exception:
+                self._redis_failed()
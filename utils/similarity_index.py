@@ -0,0 +1,163 @@
+# © 2025 Dowek Analytics Ltd.
+# ORACLE SAMUEL – The Real Estate Market Prophet
+# MD5-Protected AI System. Unauthorized use prohibited.
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+
+# Location columns matched exactly, most specific first
+PARTITION_COLUMNS = ['city', 'district']
+
+# Partitions smaller than this fall back to the next, broader level
+MIN_PARTITION_ROWS = 20
+
+LEAF_SIZE = 40
+
+
+def similarity_index_path(model_path):
+    """Index file stored next to a model artifact"""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.neighbors.pkl"
+
+
+def _plain(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _location_key(values):
+    return tuple('' if pd.isna(value) else str(value).strip().lower() for value in values)
+
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index of comparable properties
+    Numeric features are standardized once; one KD-tree is built per
+    (city, district), per city and over the whole dataset. A query uses the
+    most specific partition with at least k rows.
+    """
+
+    def __init__(self, feature_columns, price_column, partition_columns, means, scales,
+                 prices, locations, row_ids, trees, dataset_md5=None):
+        self.feature_columns = feature_columns
+        self.price_column = price_column
+        self.partition_columns = partition_columns
+        self.means = means
+        self.scales = scales
+        self.prices = prices
+        self.locations = locations
+        self.row_ids = row_ids
+        self.trees = trees
+        self.dataset_md5 = dataset_md5
+
+    @classmethod
+    def build(cls, df, price_column, feature_columns=None, dataset_md5=None,
+              min_partition_rows=MIN_PARTITION_ROWS):
+        """Index df's numeric features, partitioned by the location columns it has"""
+        if feature_columns is None:
+            feature_columns = [
+                col for col in df.select_dtypes(include=[np.number, bool]).columns
+                if col != price_column
+            ]
+        partition_columns = [col for col in PARTITION_COLUMNS if col in df.columns]
+
+        values = df[feature_columns].to_numpy(dtype=float, na_value=np.nan)
+        means = np.nanmean(values, axis=0)
+        scales = np.nanstd(values, axis=0)
+        means = np.where(np.isnan(means), 0.0, means)
+        scales = np.where(np.isnan(scales) | (scales == 0), 1.0, scales)
+
+        # Missing features sit at the column mean, i.e. 0 once standardized
+        scaled = (values - means) / scales
+        scaled[np.isnan(scaled)] = 0.0
+
+        prices = df[price_column].to_numpy(dtype=float, na_value=np.nan)
+        locations = [_location_key(row) for row in df[partition_columns].itertuples(index=False, name=None)]
+
+        # Tree data is copied per partition; rows keep their position in the full arrays
+        trees = {(): (KDTree(scaled, leaf_size=LEAF_SIZE), np.arange(len(df)))}
+        for level in range(1, len(partition_columns) + 1):
+            keys = pd.Series([key[:level] for key in locations])
+            for key, positions in keys.groupby(keys).indices.items():
+                if len(positions) >= min_partition_rows:
+                    trees[key] = (KDTree(scaled[positions], leaf_size=LEAF_SIZE), positions)
+
+        return cls(
+            feature_columns, price_column, partition_columns, means, scales,
+            prices, locations, df.index.to_numpy(), trees, dataset_md5
+        )
+
+    def save(self, path):
+        """Write the index atomically"""
+        tmp_path = f"{path}.tmp"
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+    @property
+    def size(self):
+        return len(self.prices)
+
+    def _partition(self, location, k):
+        """Most specific tree holding at least k rows"""
+        for level in range(len(location), -1, -1):
+            entry = self.trees.get(location[:level])
+            if entry is not None and len(entry[1]) >= k:
+                return location[:level], entry
+        return (), self.trees[()]
+
+    def query(self, features, k=5):
+        """
+        Top-k comparables for each row of a feature frame
+
+        Returns one list per row of {'row', 'price', 'distance', 'match_level', ...}.
+        """
+        n = len(features)
+        present = [j for j, col in enumerate(self.feature_columns) if col in features.columns]
+        X = np.full((n, len(self.feature_columns)), np.nan)
+        X[:, present] = features[[self.feature_columns[j] for j in present]].to_numpy(dtype=float, na_value=np.nan)
+        X = (X - self.means) / self.scales
+        X[np.isnan(X)] = 0.0
+
+        if self.partition_columns and all(col in features.columns for col in self.partition_columns):
+            locations = [_location_key(row) for row in zip(*(features[col] for col in self.partition_columns))]
+        else:
+            locations = [()] * n
+
+        # One tree query per partition for all the rows that land in it
+        groups = {}
+        for i, location in enumerate(locations):
+            # Blank districts are not an exact match for anything
+            while location and location[-1] == '':
+                location = location[:-1]
+            key, entry = self._partition(location, k)
+            groups.setdefault(key, (entry, []))[1].append(i)
+
+        results = [None] * n
+        for key, ((tree, positions), members) in groups.items():
+            distances, neighbours = tree.query(X[members], k=min(k, len(positions)))
+            tree_data = np.asarray(tree.data)
+            match_level = self.partition_columns[len(key) - 1] if key else 'global'
+
+            for i, row_distances, row_neighbours in zip(members, distances, neighbours):
+                rows = positions[row_neighbours]
+                neighbour_features = tree_data[row_neighbours] * self.scales + self.means
+                results[i] = [
+                    {
+                        'row': _plain(self.row_ids[row]),
+                        'price': float(self.prices[row]),
+                        'distance': float(distance),
+                        'match_level': match_level,
+                        **dict(zip(self.partition_columns, self.locations[row])),
+                        **dict(zip(self.feature_columns, map(float, feature_values)))
+                    }
+                    for row, distance, feature_values in zip(rows, row_distances, neighbour_features)
+                ]
+        return results